@@ -0,0 +1,61 @@
+"""Compare resolving import-modules-only names through astroid vs. with the file-system SpecFinder.
+
+Run with `python -m benchmarks.import_resolution`. The imported names come from numpy, pandas and django; names from
+packages that aren't installed are resolved too, they just exercise the "not found" paths.
+"""
+import timeit
+import typing  # pylint: disable=unused-import
+
+import astroid
+
+from shopify_python import import_resolution
+
+IMPORTS = {
+    'numpy': ['array', 'linalg', 'random', 'fft', 'ndarray', 'float64', 'testing', 'ma', 'polynomial', 'dtype',
+              'lib', 'typing', 'core', 'where', 'zeros'],
+    'numpy.lib': ['stride_tricks', 'recfunctions', 'format', 'NumpyVersion'],
+    'pandas': ['DataFrame', 'Series', 'api', 'io', 'plotting', 'testing', 'core', 'errors', 'tseries', 'read_csv',
+               'Timestamp', 'arrays'],
+    'pandas.api': ['types', 'extensions', 'indexers'],
+    'pandas.core': ['frame', 'series', 'groupby', 'dtypes', 'common'],
+    'django.db': ['models', 'transaction', 'connection', 'migrations', 'router', 'IntegrityError'],
+    'django.db.models': ['Q', 'F', 'functions', 'signals', 'fields', 'query', 'Count'],
+    'django.http': ['HttpResponse', 'JsonResponse', 'Http404', 'request', 'response'],
+    'django.conf': ['settings', 'urls', 'global_settings'],
+    'django.utils': ['timezone', 'functional', 'translation', 'text', 'html', 'encoding', 'dateparse'],
+    'django.contrib': ['admin', 'auth', 'messages', 'sessions', 'contenttypes'],
+    'django.shortcuts': ['render', 'redirect', 'get_object_or_404'],
+    'django.core': ['exceptions', 'management', 'cache', 'mail', 'validators', 'serializers', 'signing'],
+}  # type: typing.Dict[str, typing.List[str]]
+
+
+def _names():  # type: () -> typing.List[str]
+    names = []  # type: typing.List[str]
+    for module, attributes in sorted(IMPORTS.items()):
+        names.extend('.'.join((module, attribute)) for attribute in attributes)
+    return names
+
+
+NAMES = _names()
+
+
+def _resolve(finder):  # type: (typing.Optional[import_resolution.SpecFinder]) -> typing.List[bool]
+    astroid.MANAGER.clear_cache()  # Nothing built by an earlier repetition should help
+    importer = astroid.parse('')
+    resolver = import_resolution.ImportResolver(finder=finder)
+    return [resolver.is_module(importer, name) for name in NAMES]
+
+
+def main():  # type: () -> None
+    assert _resolve(None) == _resolve(import_resolution.SpecFinder())
+    undecided = sum(1 for name in NAMES if import_resolution.SpecFinder().find(name) is None)
+
+    print('{} names, {} of them left to astroid by the SpecFinder'.format(len(NAMES), undecided))
+    with_astroid = min(timeit.repeat(lambda: _resolve(None), number=1, repeat=3))
+    with_finder = min(timeit.repeat(lambda: _resolve(import_resolution.SpecFinder()), number=1, repeat=3))
+    print('astroid:    {:.3f}s'.format(with_astroid))
+    print('SpecFinder: {:.3f}s ({:.1f}x)'.format(with_finder, with_astroid / with_finder))
+
+
+if __name__ == '__main__':
+    main()
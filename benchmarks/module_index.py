@@ -0,0 +1,125 @@
+"""Compare the ways the Google style checks can size try, except, finally and lambda subtrees.
+
+Run with `python -m benchmarks.module_index [lines]`; the default generates a module of roughly 50,000 lines. Subtrees
+are either counted in full by walking astroid, counted no further than their limit and then in full once it is exceeded
+(what the checker does), or sized from a ModuleIndex of the whole module. Each is timed on the module as generated,
+where no subtree exceeds its limit, and with one oversized lambda appended. The times include finding the subtrees,
+which all three share.
+"""
+import sys
+import timeit
+import typing  # pylint: disable=unused-import
+
+import astroid
+
+import shopify_python.ast
+from shopify_python import size_rules
+
+_BLOCK = '''
+class Stage{n}(object):
+    INPUTS = {{}}
+
+    def apply(self, values):
+        try:
+            try:
+                total = sum(map(lambda x, y: x * 2 + y, values, values))
+            except ValueError as error:
+                total = [v for v in values if v is not None and v > {n}]
+        finally:
+            values = sorted(values, key=lambda v: -v)
+        return total
+
+
+module_var_{n} = Stage{n}()
+'''
+
+_OVERSIZED_LAMBDA = 'scale = lambda x, y: (x * 2 + y) if x % 2 == 0 else (y * 3 + x)\n'
+
+# Sizes the subtrees rooted at some nodes: their exact size if it exceeds the limit, otherwise None
+Sizer = typing.Callable[[typing.List[astroid.NodeNG], int], typing.Optional[int]]
+
+
+def generate_module(lines):  # type: (int) -> str
+    block_lines = _BLOCK.count('\n')
+    return 'from os import path\n' + ''.join(_BLOCK.format(n=n) for n in range(lines // block_lines))
+
+
+def _exceeding(size, limit):  # type: (int, int) -> typing.Optional[int]
+    return size if size > limit else None
+
+
+def _sizes_by_walking(module):  # type: (astroid.Module) -> typing.List[int]
+    """The sizes as gathered before the bounded counts: every subtree counted in full, recursively."""
+
+    def count_tree_size(node):  # type: (astroid.NodeNG) -> int
+        return 1 + sum(count_tree_size(child) for child in node.get_children())
+
+    def size(nodes, limit):  # type: (typing.List[astroid.NodeNG], int) -> typing.Optional[int]
+        return _exceeding(sum(count_tree_size(node) for node in nodes), limit)
+
+    return _reported_sizes(module, size)
+
+
+def _sizes_bounded(module):  # type: (astroid.Module) -> typing.List[int]
+    """The sizes as the checker gathers them: bounded counts, then full counts of the subtrees exceeding a limit."""
+
+    def size(nodes, limit):  # type: (typing.List[astroid.NodeNG], int) -> typing.Optional[int]
+        remaining = limit
+        for node in nodes:
+            remaining -= shopify_python.ast.count_tree_size(node, limit=remaining)
+            if remaining < 0:
+                return sum(shopify_python.ast.count_tree_size(node) for node in nodes)
+        return None
+
+    return _reported_sizes(module, size)
+
+
+def _sizes_from_index(module):  # type: (astroid.Module) -> typing.List[int]
+    """The sizes read from a ModuleIndex built in one traversal, whether or not a limit is exceeded."""
+    index = shopify_python.ast.ModuleIndex(module)
+
+    def size(nodes, limit):  # type: (typing.List[astroid.NodeNG], int) -> typing.Optional[int]
+        return _exceeding(sum(index.size(node) for node in nodes), limit)
+
+    return _reported_sizes(module, size)
+
+
+def _reported_sizes(module, size):  # type: (astroid.Module, Sizer) -> typing.List[int]
+    """The sizes of the subtrees exceeding the default limits, found with size."""
+    found = []  # type: typing.List[typing.Optional[int]]
+    for node in module.nodes_of_class((astroid.TryExcept, astroid.TryFinally, astroid.Lambda)):
+        if isinstance(node, astroid.FunctionDef):
+            continue  # FunctionDef subclasses Lambda, but pylint only calls visit_lambda for lambdas
+        if isinstance(node, astroid.TryExcept):
+            found.append(size(node.body, size_rules.MAX_TRY_NODES))
+            found.extend(size([handler], size_rules.MAX_EXCEPT_NODES) for handler in node.handlers)
+        elif isinstance(node, astroid.TryFinally):
+            found.append(size(node.finalbody, size_rules.MAX_FINALLY_NODES))
+        else:
+            found.append(size([node], size_rules.MAX_LAMBDA_NODES))
+    return [exceeding for exceeding in found if exceeding is not None]
+
+
+def _compare(module):  # type: (astroid.Module) -> None
+    sizes = _sizes_by_walking(module)
+    assert sizes == _sizes_bounded(module) == _sizes_from_index(module)
+
+    print('Module of {} lines, {} nodes, {} oversized subtrees'.format(
+        module.tolineno, shopify_python.ast.count_tree_size(module), len(sizes)))
+    walking = min(timeit.repeat(lambda: _sizes_by_walking(module), number=1, repeat=3))
+    bounded = min(timeit.repeat(lambda: _sizes_bounded(module), number=1, repeat=3))
+    indexed = min(timeit.repeat(lambda: _sizes_from_index(module), number=1, repeat=3))
+    print('  Counting in full:          {:.3f}s'.format(walking))
+    print('  Bounded counts:            {:.3f}s ({:.1f}x)'.format(bounded, walking / bounded))
+    print('  ModuleIndex for every one: {:.3f}s ({:.1f}x)'.format(indexed, walking / indexed))
+
+
+def main(argv):  # type: (typing.List[str]) -> None
+    lines = int(argv[0]) if argv else 50000
+    source = generate_module(lines)
+    _compare(astroid.parse(source))
+    _compare(astroid.parse(source + _OVERSIZED_LAMBDA))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
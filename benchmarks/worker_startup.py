@@ -0,0 +1,70 @@
+"""Compare how long a worker of pylint_files(jobs > 1) takes to lint one small file, with and without preload.
+
+Run with `python -m benchmarks.worker_startup [jobs]`. Each file imports pylint, astroid and GitPython (dependencies of
+this package, so always installed), which pylint has to build trees of to infer the attribute accesses. Workers are
+only forked, and so start with what was preloaded, on Linux.
+"""
+import io
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import typing  # pylint: disable=unused-import
+
+from shopify_python import git_utils
+
+MODULES = ['pylint.lint', 'astroid', 'git.repo']
+
+_SOURCE = '''"""Uses some heavy dependencies."""
+import astroid
+from git import repo
+from pylint import lint
+
+print(astroid.MANAGER, repo.Repo, lint.Run)
+'''
+
+
+def _lint_one(path):  # type: (str) -> float
+    """The time a worker takes to give the messages of path, as a shard of its own."""
+    start = time.time()
+    git_utils._pylint_shard(([path], ['--reports=n']))  # pylint: disable=protected-access
+    return time.time() - start
+
+
+def _worker_times(paths):  # type: (typing.List[str]) -> typing.List[float]
+    pool = git_utils._worker_pool(len(paths))  # pylint: disable=protected-access
+    try:
+        return pool.map(_lint_one, paths)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(argv=None):  # type: (typing.Optional[typing.List[str]]) -> None
+    argv = sys.argv[1:] if argv is None else argv
+    jobs = int(argv[0]) if argv else multiprocessing.cpu_count()
+    directory = tempfile.mkdtemp()
+    try:
+        paths = [os.path.join(directory, 'user{}.py'.format(index)) for index in range(jobs)]
+        for path in paths:
+            with io.open(path, 'w') as source_file:
+                source_file.write(_SOURCE)
+
+        cold = _worker_times(paths)
+        start = time.time()
+        git_utils.preload(MODULES)
+        preloading = time.time() - start
+        warm = _worker_times(paths)
+    finally:
+        shutil.rmtree(directory)
+
+    print('{} workers'.format(jobs))
+    print('without preload: {:.3f}s per worker'.format(max(cold)))
+    print('with preload:    {:.3f}s per worker ({:.1f}x), after {:.3f}s of preloading'.format(
+        max(warm), max(cold) / max(warm), preloading))
+
+
+if __name__ == '__main__':
+    main()
@@ -33,22 +33,13 @@ setuptools.setup(
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 2',
+        'Programming Language :: Python :: 3 :: Only',
     ],
     test_suite='tests',
+    python_requires='>=3.5',
     install_requires=[
-        'GitPython~=2.1.11 ; python_version<"3.0"',
-        'GitPython>=3.1.30 ; python_version>="3.0"',
-        'typing~=3.6.6 ; python_version<"3.5"',
+        'GitPython>=3.1.30',
         'autopep8~=1.4',
+        'pylint>=2.1.1',
     ],
-    extras_require={
-        ':python_version>="3.0"': [
-            'pylint>=2.1.1'
-        ],
-        ':python_version<"3.0"': [
-            'pylint~=1.9.3'
-        ]
-    }
-
 )
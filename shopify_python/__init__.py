@@ -2,14 +2,20 @@
 # Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
 from __future__ import unicode_literals
 
-from pylint import lint
-from shopify_python import google_styleguide
-from shopify_python import shopify_styleguide
+import typing
+
+if typing.TYPE_CHECKING:
+    from pylint import lint  # pylint: disable=unused-import
 
 
 __version__ = '0.6.3'
 
 
 def register(linter):  # type: (lint.PyLinter) -> None
+    # Imported here so that the modules meant to run without pylint or astroid (e.g. size_rules) don't load them
+    # through this package
+    from shopify_python import google_styleguide  # pylint: disable=import-outside-toplevel
+    from shopify_python import shopify_styleguide  # pylint: disable=import-outside-toplevel
+
     google_styleguide.register_checkers(linter)
     shopify_styleguide.register_checkers(linter)
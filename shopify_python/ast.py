@@ -1,8 +1,188 @@
+import array
+import typing  # pylint: disable=unused-import
+
 import astroid  # pylint: disable=unused-import
 
+# NumPy once imported by _numpy, or None if it isn't installed. Loading it takes longer than most lint runs spend on
+# the metrics that use it, so it is only imported when one of them is first computed.
+_NOT_IMPORTED = object()
+_NUMPY = _NOT_IMPORTED  # type: typing.Any
+
+
+def _numpy():  # type: () -> typing.Any
+    global _NUMPY  # pylint: disable=global-statement
+    if _NUMPY is _NOT_IMPORTED:
+        try:
+            import numpy  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            numpy = None
+        _NUMPY = numpy
+    return _NUMPY
+
+
+def count_tree_size(node, limit=None):  # type: (astroid.NodeNG, typing.Optional[int]) -> int
+    """Count the nodes in the subtree rooted at node (inclusive).
 
-def count_tree_size(node):  # type: (astroid.NodeNG) -> int
-    size = 1
-    for child in node.get_children():
-        size += count_tree_size(child)
+    When a limit is given, counting stops as soon as the count exceeds it; the result is then only known to be greater
+    than limit. An explicit stack is used so deeply nested trees don't hit the recursion limit.
+    """
+    size = 0
+    stack = [node]
+    while stack:
+        size += 1
+        if limit is not None and size > limit:
+            break
+        stack.extend(stack.pop().get_children())
     return size
+
+
+_TYPE_NAMES = []  # type: typing.List[str]
+_TYPE_CODES = {}  # type: typing.Dict[str, int]
+
+
+def type_code(type_name):  # type: (str) -> int
+    """Return the code FlatTree uses for nodes of the named astroid class, registering it if it is new.
+
+    Codes are shared by every tree flattened in this process, so they can be compared and aggregated across modules.
+    """
+    if type_name not in _TYPE_CODES:
+        _TYPE_CODES[type_name] = len(_TYPE_NAMES)
+        _TYPE_NAMES.append(type_name)
+    return _TYPE_CODES[type_name]
+
+
+def type_name(code):  # type: (int) -> str
+    return _TYPE_NAMES[code]
+
+
+class FlatTree(object):  # pylint: disable=too-many-instance-attributes
+    """An astroid tree flattened into parallel compact arrays, for metrics over many nodes.
+
+    Nodes are numbered in pre-order (the root is 0), so the subtree of node i occupies positions i to
+    i + sizes[i] - 1. For every position the arrays hold the node's type code (see type_code), its parent,
+    first child and next sibling (-1 where there is none), depth, subtree size, first/last line and column.
+    No reference to the astroid nodes is kept, so the tree they came from can be released once flattened.
+
+    Batch computations use NumPy when it is installed and fall back to plain Python otherwise.
+    """
+
+    def __init__(self, root):  # type: (astroid.NodeNG) -> None
+        self.type_codes = array.array('H')
+        self.parents = array.array('l')
+        self.depths = array.array('l')
+        self.first_lines = array.array('l')
+        self.last_lines = array.array('l')
+        self.columns = array.array('l')
+
+        stack = [(root, -1, 0)]  # type: typing.List[typing.Tuple[astroid.NodeNG, int, int]]
+        while stack:
+            node, parent, depth = stack.pop()
+            position = len(self.parents)
+            self._add_node(node)
+            self.type_codes.append(_TYPE_CODES.get(type(node).__name__) or type_code(type(node).__name__))
+            self.parents.append(parent)
+            self.depths.append(depth)
+            self.first_lines.append(node.lineno or 0)
+            # end_lineno is what tolineno returns when the parser provides it, without the cost of computing it
+            self.last_lines.append(getattr(node, 'end_lineno', None) or node.tolineno or 0)
+            self.columns.append(node.col_offset or 0)
+            children = list(node.get_children())
+            children.reverse()
+            stack.extend((child, position, depth + 1) for child in children)
+
+        self.sizes = self.__subtree_sizes()
+
+        # A node's first child directly follows it and its next sibling directly follows its subtree
+        self.first_children = array.array('l', [-1]) * len(self)
+        self.next_siblings = array.array('l', [-1]) * len(self)
+        for position in range(len(self)):
+            if self.sizes[position] > 1:
+                self.first_children[position] = position + 1
+            following = position + self.sizes[position]
+            if following < len(self) and position and self.parents[following] == self.parents[position]:
+                self.next_siblings[position] = following
+
+    def _add_node(self, node):  # type: (astroid.NodeNG) -> None
+        """Called with each node in pre-order, before its arrays are filled in."""
+
+    def __len__(self):  # type: () -> int
+        return len(self.parents)
+
+    def __subtree_sizes(self):  # type: () -> array.array
+        sizes = array.array('l', [1]) * len(self)
+        numpy = _numpy()
+        if numpy is not None and len(self) > 1:
+            # Add each depth level into the one above it, deepest first, one vectorized step per level
+            np_sizes = numpy.frombuffer(sizes, dtype=self.__numpy_type)
+            np_parents = numpy.frombuffer(self.parents, dtype=self.__numpy_type)
+            np_depths = numpy.frombuffer(self.depths, dtype=self.__numpy_type)
+            order = numpy.argsort(np_depths, kind='stable')
+            bounds = numpy.searchsorted(np_depths[order], numpy.arange(np_depths.max() + 2))
+            for depth in range(int(np_depths.max()), 0, -1):
+                level = order[bounds[depth]:bounds[depth + 1]]
+                numpy.add.at(np_sizes, np_parents[level], np_sizes[level])
+        else:
+            # In pre-order every node comes after its parent, so a reverse sweep adds each subtree to its parent
+            for position in range(len(self) - 1, 0, -1):
+                sizes[self.parents[position]] += sizes[position]
+        return sizes
+
+    def children(self, position):  # type: (int) -> typing.Generator[int, None, None]
+        child = self.first_children[position]
+        while child >= 0:
+            yield child
+            child = self.next_siblings[child]
+
+    def depth_histogram(self):  # type: () -> typing.List[int]
+        """Return the number of nodes at each depth, indexed by depth."""
+        numpy = _numpy()
+        if numpy is not None:
+            return [int(count) for count in numpy.bincount(numpy.frombuffer(self.depths, dtype=self.__numpy_type))]
+        histogram = [0] * (max(self.depths) + 1)
+        for depth in self.depths:
+            histogram[depth] += 1
+        return histogram
+
+    def function_sizes(self):  # type: () -> typing.Dict[int, int]
+        """Return the subtree size of every function and method, keyed by position."""
+        codes = {type_code('FunctionDef'), type_code('AsyncFunctionDef')}
+        return {position: self.sizes[position] for position, code in enumerate(self.type_codes) if code in codes}
+
+    @property
+    def __numpy_type(self):  # type: () -> typing.Any
+        return _numpy().int64 if self.parents.itemsize == 8 else _numpy().int32
+
+
+class ModuleIndex(FlatTree):
+    """A FlatTree with a mapping from astroid nodes to their positions, to look up the size of any subtree in O(1).
+
+    The checks count nodes with count_tree_size instead, as few subtrees are ever sized and flattening a tree costs more
+    than counting one; benchmarks.module_index compares the two.
+    """
+
+    def __init__(self, root):  # type: (astroid.NodeNG) -> None
+        self.nodes = []  # type: typing.List[astroid.NodeNG]
+        self.__positions = {}  # type: typing.Dict[astroid.NodeNG, int]
+        super(ModuleIndex, self).__init__(root)
+
+    def _add_node(self, node):  # type: (astroid.NodeNG) -> None
+        self.__positions[node] = len(self.nodes)
+        self.nodes.append(node)
+
+    @property
+    def root(self):  # type: () -> astroid.NodeNG
+        return self.nodes[0]
+
+    def __len__(self):  # type: () -> int
+        return len(self.nodes)
+
+    def __contains__(self, node):  # type: (astroid.NodeNG) -> bool
+        return node in self.__positions
+
+    def position(self, node):  # type: (astroid.NodeNG) -> int
+        """Return the pre-order position of node in the module."""
+        return self.__positions[node]
+
+    def size(self, node):  # type: (astroid.NodeNG) -> int
+        """Return the number of nodes in the subtree rooted at node (inclusive)."""
+        return self.sizes[self.__positions[node]]
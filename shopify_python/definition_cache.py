@@ -0,0 +1,87 @@
+import collections
+import hashlib
+import json
+import os
+import typing  # pylint: disable=unused-import
+
+import shopify_python.import_resolution
+
+
+def definition_key(source_lines, fingerprint):  # type: (typing.Sequence[bytes], str) -> str
+    """Hash the source lines of a top-level definition, normalized, together with the fingerprint of the settings.
+
+    Line endings and trailing whitespace are ignored. Anything else, including comments and blank lines, counts: the
+    checks look at blank lines, and lines within the definition are what messages are remapped by.
+    """
+    digest = hashlib.sha256(fingerprint.encode('utf-8') + b'\0')
+    for line in source_lines:
+        digest.update(line.rstrip() + b'\n')
+    return digest.hexdigest()
+
+
+# A message of a definition: line is relative to the first line of the definition, and node_type and column identify
+# the node the message is about
+DefinitionMessage = collections.namedtuple('DefinitionMessage', ['symbol', 'line', 'column', 'node_type', 'args'])
+
+
+class DefinitionCache(object):
+    """The messages of top-level definitions by definition_key, kept in a single JSON file in directory.
+
+    Entries are kept in order of last use, and save drops the least recently used ones beyond max_entries. Processes
+    sharing the directory (e.g. pylint's jobs) each merge the entries they used into the file as it is when they
+    save, so one doesn't drop what another stored. A run that only reads entries doesn't write the file, so the order
+    on disk is that of the runs that stored some.
+    """
+
+    def __init__(self, directory, max_entries=100000):  # type: (str, int) -> None
+        self.path = os.path.join(directory, 'definitions.json')
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__entries = self.__load()
+        self.__used = collections.OrderedDict()  # type: collections.OrderedDict
+        self.__modified = False
+
+    def __len__(self):  # type: () -> int
+        return len(self.__entries)
+
+    def get(self, key):  # type: (str) -> typing.Optional[typing.List[DefinitionMessage]]
+        """Return the messages stored under key, or None if the definition hasn't been checked before."""
+        messages = self.__entries.get(key)
+        if messages is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__use(key, messages)
+        return messages
+
+    def set(self, key, messages):  # type: (str, typing.List[DefinitionMessage]) -> None
+        self.__use(key, messages)
+        self.__modified = True
+
+    def save(self):  # type: () -> None
+        """If entries were stored, write the file with the entries used here as the most recent (see
+        write_atomically)."""
+        if not self.__modified:
+            return
+        self.__entries = self.__load()
+        for key, messages in self.__used.items():
+            self.__entries.pop(key, None)
+            self.__entries[key] = messages
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+        content = json.dumps(list(self.__entries.items()))
+        shopify_python.import_resolution.write_atomically(self.path, content.encode('utf-8'))
+        self.__used.clear()
+        self.__modified = False
+
+    def __use(self, key, messages):  # type: (str, typing.List[DefinitionMessage]) -> None
+        for entries in (self.__entries, self.__used):
+            entries.pop(key, None)
+            entries[key] = messages
+
+    def __load(self):  # type: () -> collections.OrderedDict
+        entries = collections.OrderedDict()  # type: collections.OrderedDict
+        for key, messages in shopify_python.import_resolution.load_json(self.path) or []:  # Missing: start afresh
+            entries[key] = [DefinitionMessage(*message) for message in messages]
+        return entries
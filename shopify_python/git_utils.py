@@ -1,13 +1,34 @@
+import ast
+import hashlib
+import io
+import json
+import multiprocessing
+import multiprocessing.pool
 import os
+import stat
 import sys
 import typing  # pylint: disable=unused-import
+import astroid
 import autopep8
 from git import repo
 from git.refs import head  # pylint: disable=unused-import
 import pylint
+from pylint import config
+from pylint import interfaces
 from pylint import lint
 from pylint import utils  # pylint: disable=unused-import
 from pylint.reporters import text
+try:
+    from pylint.message import Message  # pylint: disable=import-modules-only
+except ImportError:  # pylint < 2.4
+    from pylint.utils import Message  # pylint: disable=import-modules-only
+try:
+    from pylint.typing import MessageLocationTuple  # pylint: disable=import-modules-only
+except ImportError:  # pylint < 2.12
+    MessageLocationTuple = None
+import shopify_python
+from shopify_python import import_resolution
+from shopify_python import quick_pass
 
 
 class GitUtilsException(Exception):
@@ -22,15 +43,69 @@ def _remote_origin_master(git_repo):
     return remote_master
 
 
-def _modified_in_branch(git_repo, other_ref):
-    # type: (repo.Repo, head.Head) -> typing.List[str]
-    common_commit = git_repo.merge_base(git_repo.active_branch, other_ref)[0]
-    diffs = common_commit.diff(git_repo.active_branch.commit)
-    changed_files = []
-    for diff in diffs:
-        if not diff.deleted_file:
-            changed_files.append(diff.b_path)
-    return changed_files
+def _nul_separated(stream, chunk_size=65536):
+    # type: (typing.BinaryIO, int) -> typing.Generator[bytes, None, None]
+    """Yield the NUL-terminated fields of a stream as they arrive."""
+    pending = b''
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        fields = (pending + chunk).split(b'\0')
+        pending = fields.pop()
+        for field in fields:
+            yield field
+    if pending:
+        yield pending
+
+
+# Modes of changed file detection, each mapped to the arguments of the single git diff that implements it
+BRANCH = 'branch'  # Committed on HEAD since it forked from the base ref
+STAGED = 'staged'  # Staged in the index, compared to HEAD
+UNSTAGED = 'unstaged'  # Modified in the working tree, compared to the index
+RANGE = 'range'  # Changed in a commit range such as A..B, or committed since a commit
+_DIFF_ARGUMENTS = {
+    BRANCH: lambda base: ['{}...HEAD'.format(base)],
+    STAGED: lambda _: ['--cached'],
+    UNSTAGED: lambda _: [],
+    RANGE: lambda base: [base if '..' in base else '{}..HEAD'.format(base)],
+}  # type: typing.Dict[str, typing.Callable[[str], typing.List[str]]]
+
+
+def _check_revision(base):
+    # type: (typing.Optional[str]) -> None
+    """Refuse a base git would read as an option."""
+    if base is not None and base.startswith('-'):
+        raise ValueError('Invalid base {!r}, expected a ref, a SHA or a commit range'.format(base))
+
+
+def _modified_between(git_repo, base_sha, head_sha):
+    # type: (repo.Repo, str, str) -> typing.Generator[str, None, None]
+    """Yield the paths added, modified or renamed from commit base_sha to commit head_sha."""
+    return _modified(git_repo, RANGE, '{}..{}'.format(base_sha, head_sha))
+
+
+def _modified(git_repo, mode, base=None):
+    # type: (repo.Repo, str, typing.Optional[str]) -> typing.Generator[str, None, None]
+    """Yield the paths added, modified or renamed in the given mode (see _DIFF_ARGUMENTS).
+
+    Parses the output of git diff while it runs, so no diff objects are built and paths are available at once.
+    """
+    # -- ends the revisions, so that git never takes base for a path
+    process = git_repo.git.diff('-z', '--name-status', '-M', '--no-color', '--no-ext-diff',
+                                *(_DIFF_ARGUMENTS[mode](base) + ['--']), as_process=True)
+    fields = _nul_separated(process.stdout)
+    for status in fields:
+        paths = [next(fields, b'')]
+        if status[:1] in (b'R', b'C'):
+            paths.append(next(fields, b''))  # Renames and copies give the source, then the destination
+        if status[:1] != b'D' and paths[-1]:
+            yield paths[-1].decode('utf-8')
+    process.wait()
+
+
+# Enough to hold any shebang line the kernel accepts
+_SHEBANG_PREFIX_SIZE = 256
+
+# Classification of files by path, along with the (size, mtime_ns) they had when classified
+_classifications = {}  # type: typing.Dict[str, typing.Tuple[typing.Tuple[int, int], bool]]
 
 
 def _file_is_python(path):
@@ -42,22 +117,157 @@ def _file_is_python(path):
     if extension:
         return False
     try:
-        with open(path) as might_be_python:
-            line = might_be_python.readline()
-            return line.startswith('#!') and 'python' in line
-    except UnicodeDecodeError:
+        with open(path, 'rb') as might_be_python:
+            line = might_be_python.read(_SHEBANG_PREFIX_SIZE).split(b'\n', 1)[0]
+    except OSError:
+        return False
+    return line.startswith(b'#!') and b'python' in line
+
+
+def _is_python_file(path):
+    # type: (str) -> bool
+    """Whether path is an existing Python file; files are only read again once their size or mtime change."""
+    try:
+        status = os.stat(path)
+    except OSError:
+        return False
+    if not stat.S_ISREG(status.st_mode):
         return False
+    key = (status.st_size, status.st_mtime_ns)
+    try:
+        classified_key, is_python = _classifications[path]
+        if classified_key == key:
+            return is_python
+    except KeyError:
+        pass
+    is_python = _file_is_python(path)
+    _classifications[path] = (key, is_python)
+    return is_python
+
+
+def _python_files(paths, jobs=None):
+    # type: (typing.List[str], typing.Optional[int]) -> typing.List[str]
+    """The paths that are existing Python files, classified in a pool of jobs threads (by default one per CPU)."""
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+        are_python = pool.map(_is_python_file, paths)
+    finally:
+        pool.close()
+        pool.join()  # No thread may be running when pylint_files forks its workers
+    return [path for path, is_python in zip(paths, are_python) if is_python]
+
+
+class GitSession(object):
+    """A repository whose branch is inspected repeatedly, e.g. by several tools in one CI job.
+
+    Keeps the Repo handle, and for the current HEAD, the base ref (by default the branch master tracks), the merge
+    base with it and the paths modified since. All of these are recomputed once HEAD moves (a new commit, a checkout
+    or a reset). Which paths are Python files is remembered for as long as the files' size and mtime don't change.
+    """
+
+    def __init__(self, root_path, base=None):
+        # type: (str, typing.Optional[str]) -> None
+        _check_revision(base)
+        self.repo = repo.Repo(root_path)
+        self.base = base
+        self.__head_sha = None  # type: typing.Optional[str]
+        self.__remote_master = None  # type: typing.Optional[head.Head]
+        self.__merge_base_sha = None  # type: typing.Optional[str]
+        self.__modified = None  # type: typing.Optional[typing.List[str]]
+
+    def __refresh(self):
+        # type: () -> str
+        """Forget everything learned at another HEAD, and return the current one."""
+        head_sha = self.repo.head.commit.hexsha
+        if head_sha != self.__head_sha:
+            self.__head_sha = head_sha
+            self.__remote_master = None
+            self.__merge_base_sha = None
+            self.__modified = None
+        return head_sha
+
+    @property
+    def remote_master(self):
+        # type: () -> head.Head
+        self.__refresh()
+        if self.__remote_master is None:
+            self.__remote_master = _remote_origin_master(self.repo)
+        return self.__remote_master
+
+    @property
+    def merge_base_sha(self):
+        # type: () -> str
+        """The commit the active branch forked from the base ref (or remote master) at."""
+        self.__refresh()
+        if self.__merge_base_sha is None:
+            base = self.remote_master if self.base is None else self.base
+            self.__merge_base_sha = self.repo.merge_base(self.repo.active_branch, base)[0].hexsha
+        return self.__merge_base_sha
+
+    def modified_files(self):
+        # type: () -> typing.List[str]
+        """The paths added, modified or renamed on the active branch since it forked from the base ref."""
+        merge_base_sha = self.merge_base_sha
+        if self.__modified is None:
+            self.__modified = list(_modified_between(self.repo, merge_base_sha, self.__head_sha))
+        return self.__modified
+
+    def is_python(self, path):
+        # type: (str) -> bool
+        """Whether path, relative to the working tree, is an existing Python file (by extension or shebang)."""
+        return _is_python_file(os.path.join(self.repo.working_dir, path))
+
+    def changed_python_files(self, jobs=None):
+        # type: (typing.Optional[int]) -> typing.List[str]
+        modified = self.modified_files()
+        python_files = set(_python_files([os.path.join(self.repo.working_dir, path) for path in modified], jobs))
+        return [path for path in modified if os.path.join(self.repo.working_dir, path) in python_files]
 
 
-def changed_python_files_in_tree(root_path):
-    # type: (str) -> typing.List[str]
+# How many of the paths git diff streams are classified together by iter_changed_python_files_in_tree
+_CLASSIFICATION_CHUNK_SIZE = 256
 
+
+def _chunks(items, size):
+    # type: (typing.Iterable[str], int) -> typing.Generator[typing.List[str], None, None]
+    chunk = []  # type: typing.List[str]
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_changed_python_files_in_tree(root_path, base=None, mode=BRANCH, jobs=None):
+    # type: (str, typing.Optional[str], str, typing.Optional[int]) -> typing.Generator[str, None, None]
+    """Yield the existing Python files changed in root_path's repository, relative to its working tree.
+
+    In the BRANCH mode, files committed since HEAD forked from base (a ref or SHA, by default the branch master
+    tracks); in the RANGE mode, files changed in the commit range base (e.g. "v1.0..HEAD", or a single commit for
+    everything committed since, up to HEAD); in the STAGED and UNSTAGED modes, files with staged or unstaged changes,
+    and base is unused.
+    Paths are classified in chunks as git streams them, each in a pool of jobs threads (see _python_files).
+    """
+    if mode not in _DIFF_ARGUMENTS:
+        raise ValueError('Unknown mode {}, expected one of {}'.format(mode, ', '.join(sorted(_DIFF_ARGUMENTS))))
+    if mode == RANGE and not base:
+        raise ValueError('The range mode requires a commit range as base')
+    _check_revision(base)
     git_repo = repo.Repo(root_path)
-    remote_master = _remote_origin_master(git_repo)
-    modified = _modified_in_branch(git_repo, remote_master)
-    abs_modified = [os.path.join(git_repo.working_dir, x) for x in modified]
-    return [mod for (mod, abs_mod) in zip(modified, abs_modified)
-            if os.path.exists(abs_mod) and os.path.isfile(abs_mod) and _file_is_python(abs_mod)]
+    if mode == BRANCH and base is None:
+        base = str(_remote_origin_master(git_repo))
+    for chunk in _chunks(_modified(git_repo, mode, base), _CLASSIFICATION_CHUNK_SIZE):
+        python_files = set(_python_files([os.path.join(git_repo.working_dir, path) for path in chunk], jobs))
+        for path in chunk:
+            if os.path.join(git_repo.working_dir, path) in python_files:
+                yield path
+
+
+def changed_python_files_in_tree(root_path, base=None, mode=BRANCH, jobs=None):
+    # type: (str, typing.Optional[str], str, typing.Optional[int]) -> typing.List[str]
+    return list(iter_changed_python_files_in_tree(root_path, base, mode, jobs))
 
 
 # Options are defined here: https://pypi.python.org/pypi/autopep8#usage
@@ -107,29 +317,451 @@ def autopep_files(files, max_line_length):
     autopep8.fix_multiple_files(files, options, sys.stdout)
 
 
-class _CustomPylintReporter(text.ColorizedTextReporter):
+class CustomPylintReporter(text.ColorizedTextReporter):
 
-    def __init__(self):
-        # type: () -> None
-        super(_CustomPylintReporter, self).__init__()
+    def __init__(self, output=None):
+        # type: (typing.Optional[typing.TextIO]) -> None
+        super(CustomPylintReporter, self).__init__(output)
         self.raw_messages = []  # type: typing.List[utils.Message]
+        self.records = []  # type: typing.List[tuple]
 
     def handle_message(self, msg):
         # type: (utils.Message) -> None
         self.raw_messages.append(msg)
-        super(_CustomPylintReporter, self).handle_message(msg)
+        self.records.append(_message_record(msg))  # Before the message is colorized
+        super(CustomPylintReporter, self).handle_message(msg)
+
+
+_LOCATION_FIELDS = ('abspath', 'path', 'module', 'obj', 'line', 'column', 'end_line', 'end_column')
 
 
-def pylint_files(files, **kwargs):
-    # type: (typing.List[str], **str) -> typing.Iterable[utils.Message]
-    kwargs['reports'] = 'n'
-    pylint_args = ["--{}={}".format(key, value) for key, value in kwargs.items()]
+def _message_record(msg):
+    # type: (utils.Message) -> tuple
+    """A compact, picklable form of a message, from which message_from_record recreates it."""
+    return (msg.msg_id, msg.symbol, tuple(getattr(msg, field, None) for field in _LOCATION_FIELDS), msg.msg,
+            msg.confidence)
 
-    reporter = _CustomPylintReporter()
+
+def message_from_record(record):
+    # type: (tuple) -> utils.Message
+    msg_id, symbol, location, msg, confidence = record
+    # pylint < 2.12 has no end positions
+    location = location[:6] if MessageLocationTuple is None else MessageLocationTuple(*location)
+    return Message(msg_id, symbol, location, msg, confidence)
+
+
+def run_pylint(files, pylint_args, reporter):
+    # type: (typing.List[str], typing.List[str], CustomPylintReporter) -> lint.PyLinter
+    """Lint files, returning the linter, which can check more files with the same settings."""
     pylint_version = int(pylint.__version__.split('.')[0])
-    if pylint_version < 2:
-        lint.Run(files + pylint_args, exit=False, reporter=reporter)  # pylint: disable=unexpected-keyword-arg
+    exit_keyword = 'exit' if pylint_version < 2 else 'do_exit'
+    return lint.Run(files + pylint_args, reporter=reporter, **{exit_keyword: False}).linter
+
+
+def _pylint_shard(shard):
+    # type: (typing.Tuple[typing.List[str], typing.List[str]]) -> typing.List[tuple]
+    """Lint a shard of files in a worker process, returning message records; the report itself is discarded."""
+    files, pylint_args = shard
+    reporter = CustomPylintReporter(io.StringIO())
+    run_pylint(files, pylint_args, reporter)
+    return reporter.records
+
+
+def _shards(files, count):
+    # type: (typing.List[str], int) -> typing.List[typing.List[int]]
+    """Split the indices of files into count shards of about the same total size, in file order within a shard."""
+    def size(path):
+        # type: (str) -> int
+        return sum(os.path.getsize(python_file) for python_file in quick_pass.python_files_in([path]))
+
+    shards = [[] for _ in range(count)]  # type: typing.List[typing.List[int]]
+    totals = [0] * count
+    # The largest files first, each to the lightest shard so far (ties broken by position for determinism)
+    for size_of_file, index in sorted(((size(path), index) for index, path in enumerate(files)),
+                                      key=lambda item: (-item[0], item[1])):
+        lightest = min(range(count), key=lambda shard: (totals[shard], shard))
+        shards[lightest].append(index)
+        totals[lightest] += size_of_file
+    return [sorted(shard) for shard in shards if shard]
+
+
+class ArgumentIndex(object):  # pylint: disable=too-few-public-methods
+    """Finds the argument among files that message records are about, looking each record up rather than each file.
+
+    Arguments that exist are matched by the absolute path of the file a record is about or of a directory holding
+    it, other arguments as module names. Paths are resolved against the working directory, as pylint resolves them;
+    the paths of some records (e.g. syntax errors) are relative.
+    """
+
+    def __init__(self, files):
+        # type: (typing.List[str]) -> None
+        self.__paths = {}  # type: typing.Dict[str, int]
+        self.__modules = {}  # type: typing.Dict[str, int]
+        for index, path in enumerate(files):
+            if os.path.exists(path):
+                self.__paths.setdefault(os.path.abspath(path), index)
+            else:
+                self.__modules.setdefault(path, index)
+
+    def find(self, record):
+        # type: (tuple) -> typing.Optional[int]
+        """The index of the argument record is about, or None (e.g. for option errors)."""
+        _, _, location, _, _ = record
+        abspath, module = location[0], location[2]
+        indices = []  # type: typing.List[int]
+        if abspath and self.__paths:
+            path, parent = os.path.abspath(abspath), None
+            while path != parent:
+                if path in self.__paths:
+                    indices.append(self.__paths[path])
+                path, parent = os.path.dirname(path), path
+        if module and self.__modules:
+            parts = module.split('.')
+            indices.extend(self.__modules['.'.join(parts[:length])] for length in range(len(parts), 0, -1)
+                           if '.'.join(parts[:length]) in self.__modules)
+        return min(indices) if indices else None
+
+
+# pylint >= 2.14 parses every file before checking any, so the messages of failed parses come before all others
+_PARSES_BEFORE_CHECKING = hasattr(lint.PyLinter, '_get_asts')
+_PARSE_SYMBOLS = frozenset(('syntax-error', 'astroid-error'))
+
+
+def preload(modules=()):
+    # type: (typing.Iterable[str]) -> typing.List[str]
+    """Import pylint's checkers and build astroid's trees of modules (by name) in this process, returning the names of
+    the modules that couldn't be built.
+
+    On Linux, the workers of pylint_files(jobs > 1) are forked from this process, so they start with all of it
+    instead of each importing the checkers and building the trees of the same dependencies again.
+    """
+    lint.PyLinter().load_default_plugins()
+    failed = []  # type: typing.List[str]
+    for name in modules:
+        try:
+            astroid.MANAGER.ast_from_module_name(name)
+        except astroid.exceptions.AstroidError:
+            failed.append(name)
+    return failed
+
+
+# Elsewhere, forking a process that has used the system's libraries (e.g. on macOS) isn't safe
+_FORKS_WORKERS = sys.platform.startswith('linux')
+
+
+def _worker_pool(processes):  # type: (int) -> multiprocessing.pool.Pool
+    """A pool of processes forked from this one on Linux, with its modules and astroid trees; elsewhere, of processes
+    started the platform's default way."""
+    if _FORKS_WORKERS:
+        return multiprocessing.get_context('fork').Pool(processes)
+    return multiprocessing.Pool(processes)
+
+
+# How pylint_files lints: with which arguments, in how many processes, and having preloaded which modules
+_LintSettings = typing.NamedTuple('_LintSettings', [  # pylint: disable=global-variable,invalid-name
+    ('pylint_args', typing.List[str]),
+    ('jobs', int),
+    ('preload_modules', typing.Iterable[str]),
+])
+
+
+def _pylint_files_with_settings(files, settings, reporter):
+    # type: (typing.List[str], _LintSettings, CustomPylintReporter) -> None
+    if settings.jobs > 1 and len(files) > 1:
+        _pylint_files_in_parallel(files, settings, reporter)
     else:
-        lint.Run(files + pylint_args, do_exit=False, reporter=reporter)  # pylint: disable=unexpected-keyword-arg
+        run_pylint(files, settings.pylint_args, reporter)
+
+
+def _pylint_files_in_parallel(files, settings, reporter):
+    # type: (typing.List[str], _LintSettings, CustomPylintReporter) -> None
+    """Lint files in a pool of processes, feeding the messages to reporter in the order one process would."""
+    shards = _shards(files, min(settings.jobs, len(files)))
+    if _FORKS_WORKERS:
+        preload(settings.preload_modules)
+    pool = _worker_pool(len(shards))
+    try:
+        shard_records = pool.map(_pylint_shard, [([files[index] for index in shard], settings.pylint_args)
+                                                 for shard in shards])
+    finally:
+        pool.close()
+        pool.join()
+
+    for record in _merged_records(files, shard_records):
+        reporter.handle_message(message_from_record(record))
+
+
+def _merged_records(files, record_lists):
+    # type: (typing.List[str], typing.List[typing.List[tuple]]) -> typing.List[tuple]
+    """Merge the message records of separate runs over parts of files into the order of a single run over all."""
+    arguments = ArgumentIndex(files)
+    # Messages about the run itself, such as option errors, come first and are emitted by every run
+    run_records = [record for record in record_lists[0] if arguments.find(record) is None]
+    file_records = []  # type: typing.List[typing.Tuple[int, int, int, int, tuple]]
+    for list_index, records in enumerate(record_lists):
+        for position, record in enumerate(records):
+            argument_index = arguments.find(record)
+            if argument_index is not None:
+                phase = 0 if _PARSES_BEFORE_CHECKING and record[1] in _PARSE_SYMBOLS else 1
+                file_records.append((phase, argument_index, list_index, position, record))
+    file_records.sort(key=lambda item: item[:4])
+    return run_records + [record for _, _, _, _, record in file_records]
+
+
+# The Python pylint runs on decides what parses (e.g. syntax errors) and what the standard library has
+_PYTHON_VERSION = '{} {}'.format(sys.implementation.name, '.'.join(str(part) for part in sys.version_info))
+
+
+class LintCache(object):
+    """The messages pylint gave for files, in a directory holding a JSON file per entry, which processes share freely.
+
+    Entries are keyed by a hash of the content of the file, the pylint settings (arguments and rcfile) and the
+    versions of shopify_python, pylint, astroid and Python, so a change to any of these is a miss. Messages that depend
+    on other modules, such as inferred no-member or duplicate-code, are only as fresh as the file itself. The messages
+    about a run itself, such as option errors, are stored under a run_key of the settings. Reading an entry marks it as
+    recently used, and evict removes the least recently used entries beyond max_size bytes.
+    """
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024):  # type: (str, int) -> None
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):  # type: () -> int
+        return len(self.__entries())
+
+    def key(self, path, fingerprint):  # type: (str, str) -> str
+        """The key of the messages for the file at path, linted with the settings of fingerprint (see
+        config_fingerprint)."""
+        digest = self.__digest('file', fingerprint)
+        with io.open(path, 'rb') as python_file:
+            for chunk in iter(lambda: python_file.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def run_key(self, fingerprint):  # type: (str) -> str
+        """The key of the messages about a run with the settings of fingerprint from the working directory,
+        which the paths of the messages (e.g. of the rcfile) are relative to."""
+        return self.__digest('run', fingerprint, os.getcwd()).hexdigest()
+
+    @staticmethod
+    def __digest(*parts):  # type: (*str) -> typing.Any
+        digest = hashlib.sha256()
+        for part in (shopify_python.__version__, pylint.__version__, astroid.__version__, _PYTHON_VERSION) + parts:
+            digest.update(part.encode('utf-8') + b'\0')
+        return digest
+
+    def get(self, key):  # type: (str) -> typing.Optional[typing.List[tuple]]
+        """Return the message records stored under key, or None if there are none."""
+        path = self.__path(key)
+        try:
+            with io.open(path, encoding='utf-8') as entry_file:
+                entry = json.load(entry_file)
+            os.utime(path, None)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [record_from_json(record) for record in entry]
+
+    def set(self, key, records):  # type: (str, typing.List[tuple]) -> None
+        entry = [record_to_json(record) for record in records]
+        import_resolution.write_atomically(self.__path(key), json.dumps(entry).encode('utf-8'))
+
+    def evict(self):  # type: () -> None
+        """Remove the least recently used entries until the rest take up at most max_size bytes."""
+        entries = sorted(self.__entries(), key=lambda entry: entry[1].st_mtime, reverse=True)
+        total = 0
+        for path, entry_stat in entries:
+            total += entry_stat.st_size
+            if total > self.max_size:
+                try:
+                    os.remove(path)
+                    self.evictions += 1
+                except OSError:
+                    pass  # Removed by a concurrent run
+
+    def __path(self, key):  # type: (str) -> str
+        return os.path.join(self.directory, key + '.json')
+
+    def __entries(self):  # type: () -> typing.List[typing.Tuple[str, os.stat_result]]
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if name.endswith('.json'):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((path, os.stat(path)))
+                except OSError:
+                    pass
+        return entries
+
+
+_CONFIDENCES = {confidence.name: confidence for confidence in interfaces.CONFIDENCE_LEVELS}
+
+
+def record_to_json(record):  # type: (tuple) -> list
+    """A message record in a form json can write; record_from_json reverses it."""
+    msg_id, symbol, location, msg, confidence = record
+    return [msg_id, symbol, list(location), msg, confidence.name]
+
+
+def record_from_json(record):  # type: (list) -> tuple
+    msg_id, symbol, location, msg, confidence = record
+    return msg_id, symbol, tuple(location), msg, _CONFIDENCES.get(confidence, interfaces.UNDEFINED)
+
+
+def config_fingerprint(pylint_args):
+    # type: (typing.List[str]) -> str
+    """Hash pylint arguments and the content of the rcfile pylint reads with them."""
+    rcfile = next((argument.split('=', 1)[1] for argument in pylint_args if argument.startswith('--rcfile=')), None)
+    if rcfile is None and hasattr(config, 'find_default_config_files'):
+        rcfile = next(iter(config.find_default_config_files()), None)
+    elif rcfile is None:  # pylint < 2.5
+        rcfile = config.find_pylintrc()  # pylint: disable=no-member
+    digest = hashlib.sha256()
+    for argument in sorted(pylint_args):
+        digest.update(argument.encode('utf-8') + b'\0')
+    if rcfile and os.path.isfile(str(rcfile)):
+        with io.open(str(rcfile), 'rb') as rcfile_file:
+            digest.update(rcfile_file.read())
+    return digest.hexdigest()
+
+
+def _relocated(records, path):
+    # type: (typing.List[tuple], str) -> typing.List[tuple]
+    """Point message records stored for another copy of a file at the file at path, as pylint would have."""
+    abspath, module = os.path.abspath(path), _module_name(path)
+    return [(msg_id, symbol, (abspath, _displayed_path(abspath), module) + tuple(location[3:]), msg, confidence)
+            for msg_id, symbol, location, msg, confidence in records]
+
+
+def _module_name(path):  # type: (str) -> str
+    """The name pylint gives the module of the file at path given as an argument: from the directory its packages are
+    in, or the working directory, or sys.path."""
+    package_path = os.path.dirname(os.path.realpath(path))
+    while os.path.isfile(os.path.join(package_path, '__init__.py')) and os.path.dirname(package_path) != package_path:
+        package_path = os.path.dirname(package_path)
+    try:
+        return '.'.join(astroid.modutils.modpath_from_file(path, path=['.', package_path] + sys.path))
+    except ImportError:
+        return os.path.splitext(os.path.basename(path))[0]
+
+
+def _displayed_path(abspath):  # type: (str) -> str
+    """The path pylint shows for a file: relative to the working directory if the file is under it."""
+    prefix = os.path.join(os.getcwd(), '')
+    return abspath[len(prefix):] if abspath.startswith(prefix) else abspath
+
+
+def _pylint_files_with_cache(files, settings, reporter, cache):
+    # type: (typing.List[str], _LintSettings, CustomPylintReporter, LintCache) -> None
+    """Lint the files missing from cache and store their messages, feeding reporter the messages of all files.
+
+    Only file arguments are cached; directories and module names are always linted. The messages about the run itself
+    are replayed from the cache when every file is; if they aren't there, the first file is linted to give them.
+    """
+    fingerprint = config_fingerprint(settings.pylint_args)
+    run_key = cache.run_key(fingerprint)
+    run_records = cache.get(run_key)
+    cached_records = []  # type: typing.List[typing.List[tuple]]
+    uncached_files = []  # type: typing.List[str]
+    keys = {None: run_key}  # type: typing.Dict[typing.Optional[int], str]
+    for path in files:
+        if os.path.isfile(path):
+            key = cache.key(path, fingerprint)
+            records = cache.get(key) if run_records is not None or uncached_files else None
+            if records is not None:
+                cached_records.append(_relocated(records, path))
+                continue
+            keys[len(uncached_files)] = key
+        uncached_files.append(path)
+
+    linted_records = _pylint_and_cache(uncached_files, settings, cache, keys) if uncached_files else run_records
+    for record in _merged_records(files, [linted_records] + cached_records):
+        reporter.handle_message(message_from_record(record))
+
+
+def _pylint_and_cache(files, settings, cache, keys):
+    # type: (typing.List[str], _LintSettings, LintCache, typing.Dict[typing.Optional[int], str]) -> typing.List[tuple]
+    """Lint files, storing the messages of each files[index] in cache under keys[index], and those about the run itself
+    under keys[None], and return them all."""
+    reporter = CustomPylintReporter(io.StringIO())
+    _pylint_files_with_settings(files, settings, reporter)
+
+    arguments = ArgumentIndex(files)
+    records_by_argument = {}  # type: typing.Dict[typing.Optional[int], typing.List[tuple]]
+    for record in reporter.records:
+        records_by_argument.setdefault(arguments.find(record), []).append(record)
+    for index, key in keys.items():
+        cache.set(key, records_by_argument.get(index, []))
+    cache.evict()
+    return reporter.records
+
+
+def _imported_names(path):
+    # type: (str) -> typing.Set[str]
+    """The names of a file's absolute "from x import y" statements, as "x.y"."""
+    with open(path, 'rb') as python_file:
+        source = python_file.read()
+    if b'import' not in source:
+        return set()
+    try:
+        tree = ast.parse(source, path)
+    except (SyntaxError, ValueError):
+        return set()  # pylint reports these itself
+    return {'.'.join((node.module, alias.name)) for node in ast.walk(tree)
+            if isinstance(node, ast.ImportFrom) and not node.level for alias in node.names}
+
+
+def _imports_to_prefetch(files):  # type: (typing.List[str]) -> typing.Set[str]
+    """The names imported by files (see import_resolution.prefetching)."""
+    return set().union(*(_imported_names(path) for path in quick_pass.python_files_in(files)))
+
+
+def pylint_arguments(options):  # type: (typing.Dict[str, str]) -> typing.List[str]
+    """The pylint command line arguments for the options given to pylint_files."""
+    options = dict(options, reports='n')
+    return ["--{}={}".format(key, value) for key, value in options.items()]
+
+
+def pylint_files(files,  # type: typing.List[str]
+                 prefetch_imports=False,  # type: bool
+                 jobs=1,  # type: int
+                 cache=None,  # type: typing.Optional[LintCache]
+                 preload_modules=(),  # type: typing.Iterable[str]
+                 **kwargs  # type: str
+                 ):
+    # type: (...) -> typing.Iterable[utils.Message]
+    """Lint files (or directories, or module names) with pylint, returning the messages.
+
+    With jobs > 1, the files are split into shards of about the same size, linted in a pool of jobs processes, and
+    the messages are returned (and reported) in the order a single process gives. Checks spanning several modules,
+    such as duplicate-code and cyclic-import, only see the modules of the same shard. On Linux, the processes are forked
+    after preloading pylint's checkers and the trees of preload_modules, such as heavy dependencies imported
+    throughout the files (see preload); elsewhere they start afresh and preload_modules is ignored.
+
+    With a cache, the messages of files linted before with the same content and settings are taken from it, and only
+    the other files are linted; see LintCache.
+
+    With prefetch_imports, the import-modules-only check resolves the names the files import concurrently, as it is
+    configured, before visiting them. Names only astroid can decide are still resolved as the files are visited.
+
+    Messages merged from several runs (in parallel or with a cache) are printed in pylint's default format, since no
+    single run's msg-template applies to them.
+    """
+    settings = _LintSettings(pylint_arguments(kwargs), jobs, preload_modules)
+
+    reporter = CustomPylintReporter()
+    with import_resolution.prefetching(_imports_to_prefetch(files) if prefetch_imports else set()):
+        if cache is not None:
+            _pylint_files_with_cache(files, settings, reporter, cache)
+        else:
+            _pylint_files_with_settings(files, settings, reporter)
 
     return reporter.raw_messages
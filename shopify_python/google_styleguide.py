@@ -1,15 +1,27 @@
+import collections
 import re
+import sys
 import typing  # pylint: disable=unused-import
 
 import astroid  # pylint: disable=unused-import
 
+import pylint
 from pylint import checkers
 from pylint import interfaces
 from pylint import lint  # pylint: disable=unused-import
 
+try:
+    from pylint.checkers.utils import only_required_for_messages  # pylint: disable=import-modules-only
+except ImportError:  # pylint < 2.14
+    from pylint.checkers.utils import (  # pylint: disable=import-modules-only
+        check_messages as only_required_for_messages)
+
 import six
 
 import shopify_python.ast
+import shopify_python.definition_cache
+import shopify_python.import_resolution
+import shopify_python.size_rules
 
 
 def register_checkers(linter):  # type: (lint.PyLinter) -> None
@@ -98,20 +110,46 @@ class GoogleStyleGuideChecker(checkers.BaseChecker):
             'default': ('__future__',),
             'type': 'csv',
             'help': 'List of top-level module names separated by comma.'}),
+        ('import-resolver', {
+            'default': 'astroid',
+            'type': 'choice',
+            'choices': ('astroid', 'spec'),
+            'metavar': '<astroid or spec>',
+            'help': "How import-modules-only decides whether an imported name is a module: 'astroid' builds the "
+                    "module, 'spec' looks for its files without parsing them and only falls back to astroid for "
+                    "names it can't decide."}),
+        ('import-cache-dir', {
+            'default': '',
+            'type': 'string',
+            'metavar': '<directory>',
+            'help': 'Directory in which to remember across runs which imported names of installed distributions are '
+                    'modules. Entries are invalidated when sys.path or the installed distributions change.'}),
+        ('import-module-index', {
+            'default': '',
+            'type': 'string',
+            'metavar': '<file>',
+            'help': 'File holding an index of the modules of the standard library and installed distributions, '
+                    'used by import-modules-only. It is built on first use and rebuilt when they change.'}),
+        ('definition-cache-dir', {
+            'default': '',
+            'type': 'string',
+            'metavar': '<directory>',
+            'help': 'Directory in which to remember across runs the messages of the checks local to a definition, by '
+                    'the source of each top-level function and class, so that only changed ones are checked again.'}),
         ('max-try-nodes', {
-            'default': 25,
+            'default': shopify_python.size_rules.MAX_TRY_NODES,
             'type': 'int',
             'help': 'Number of AST nodes permitted in a try-block'}),
         ('max-except-nodes', {
-            'default': 23,
+            'default': shopify_python.size_rules.MAX_EXCEPT_NODES,
             'type': 'int',
             'help': 'Number of AST nodes permitted in an except-block'}),
         ('max-finally-nodes', {
-            'default': 13,
+            'default': shopify_python.size_rules.MAX_FINALLY_NODES,
             'type': 'int',
             'help': 'Number of AST nodes permitted in a finally-block'}),
         ('max-lambda-nodes', {
-            'default': 15,
+            'default': shopify_python.size_rules.MAX_LAMBDA_NODES,
             'type': 'int',
             'help': 'Number of AST nodes permitted in a lambda'}),
     )
@@ -147,45 +185,232 @@ class GoogleStyleGuideChecker(checkers.BaseChecker):
         ">": "gt"
     }
 
+    # Messages that only depend on the source of the top-level definition they are in, and the options below
+    DEFINITION_LOCAL_MESSAGES = frozenset((
+        'try-too-long', 'except-too-long', 'finally-too-long', 'use-simple-lambdas', 'lambda-func', 'complex-list-comp',
+        'cond-expr', 'two-arg-exception', 'string-exception', 'catch-standard-error',
+        'blank-line-after-class-required'))
+    DEFINITION_LOCAL_OPTIONS = ('max_try_nodes', 'max_except_nodes', 'max_finally_nodes', 'max_lambda_nodes')
+
+    # Class and constant name regexps by naming configuration, shared by every instance in the process
+    __naming_regexps = {}  # type: typing.Dict[tuple, typing.Tuple[typing.Pattern, typing.Pattern]]
+
     def __init__(self, linter):
         super(GoogleStyleGuideChecker, self).__init__(linter)
-        name_checker = checkers.base.NameChecker(linter)
-        (regexps, _) = name_checker._create_naming_rules()  # pylint: disable=protected-access
-        self.__class_regexp = regexps['class']
-        self.__const_regexp = regexps['const']
-
+        self.__enabled_messages = frozenset(symbol for _, symbol, _ in self.msgs.values())
+        # Shared by every module this linter checks
+        self.import_resolver = shopify_python.import_resolution.ImportResolver()
+        self.definition_cache = None  # type: typing.Optional[shopify_python.definition_cache.DefinitionCache]
+        self.__source_lines = None  # type: typing.Optional[typing.List[bytes]]
+        self.__settings_fingerprint = ''
+        self.__definition = None  # type: typing.Optional[_VisitedDefinition]
+
+    def open(self):  # type: () -> None
+        use_spec_finder = self.config.import_resolver == 'spec'  # pylint: disable=no-member
+        self.import_resolver.finder = shopify_python.import_resolution.SpecFinder() if use_spec_finder else None
+        if self.config.import_cache_dir:  # pylint: disable=no-member
+            self.import_resolver.cache = shopify_python.import_resolution.ResolutionCache(
+                self.config.import_cache_dir)  # pylint: disable=no-member
+        if self.config.import_module_index:  # pylint: disable=no-member
+            self.import_resolver.index = shopify_python.import_resolution.ModuleNameIndex.load(
+                self.config.import_module_index)  # pylint: disable=no-member
+        self.import_resolver.prefetch(shopify_python.import_resolution.requested_prefetches())
+        definition_cache_dir = self.config.definition_cache_dir  # pylint: disable=no-member
+        self.definition_cache = shopify_python.definition_cache.DefinitionCache(
+            definition_cache_dir) if definition_cache_dir else None
+
+    def close(self):  # type: () -> None
+        if self.import_resolver.cache is not None:
+            self.import_resolver.cache.save()
+        if self.import_resolver.index is not None:
+            self.import_resolver.index.close()
+            self.import_resolver.index = None
+        if self.definition_cache is not None:
+            self.definition_cache.save()
+
+    def add_message(self, msgid, *args, **kwargs):  # pylint: disable=arguments-differ
+        """Report a message, and record it if it is local to the top-level definition being checked."""
+        node = kwargs.get('node')
+        if self.__recording and node is not None and msgid in self.DEFINITION_LOCAL_MESSAGES:
+            line = node.fromlineno - self.__definition.first_line
+            self.__definition.messages.append(shopify_python.definition_cache.DefinitionMessage(
+                msgid, line, node.col_offset, type(node).__name__, kwargs.get('args')))
+        super(GoogleStyleGuideChecker, self).add_message(msgid, *args, **kwargs)
+
+    def visit_module(self, node):  # type: (astroid.Module) -> None
+        # Visitors are skipped by pylint when all of their messages are disabled; checks sharing a visitor with an
+        # enabled one are skipped here
+        self.__enabled_messages = frozenset(symbol for _, symbol, _ in self.msgs.values()
+                                            if self.linter.is_message_enabled(symbol))
+        self.__source_lines = None
+        if self.definition_cache is not None:
+            stream = node.stream()
+            if stream is not None:
+                with stream:
+                    self.__source_lines = stream.readlines()
+            self.__settings_fingerprint = repr((
+                shopify_python.__version__, pylint.__version__, astroid.__version__, tuple(sys.version_info),
+                [getattr(self.config, option) for option in self.DEFINITION_LOCAL_OPTIONS],
+                sorted(self.__enabled_messages & self.DEFINITION_LOCAL_MESSAGES)))
+
+    def leave_module(self, _):  # type: (astroid.Module) -> None
+        self.__source_lines = None
+
+    def visit_functiondef(self, node):  # type: (astroid.FunctionDef) -> None
+        self.__enter_definition(node)
+
+    visit_asyncfunctiondef = visit_functiondef
+
+    def leave_functiondef(self, node):  # type: (astroid.FunctionDef) -> None
+        self.__leave_definition(node)
+
+    leave_asyncfunctiondef = leave_functiondef
+
+    def leave_classdef(self, node):  # type: (astroid.ClassDef) -> None
+        self.__leave_definition(node)
+
+    @only_required_for_messages('global-variable')
     def visit_assign(self, node):  # type: (astroid.Assign) -> None
         self.__avoid_global_variables(node)
 
+    @only_required_for_messages('catch-standard-error')
     def visit_excepthandler(self, node):  # type: (astroid.ExceptHandler) -> None
-        self.__dont_catch_standard_error(node)
+        if not self.__replayed:
+            self.__dont_catch_standard_error(node)
 
+    @only_required_for_messages('use-simple-lambdas', 'lambda-func')
     def visit_lambda(self, node):  # type: (astroid.Lambda) -> None
-        self.__use_simple_lambdas(node)
-        self.__lambda_func(node)
-
+        if self.__replayed:
+            return
+        if 'use-simple-lambdas' in self.__enabled_messages:
+            self.__use_simple_lambdas(node)
+        if 'lambda-func' in self.__enabled_messages:
+            self.__lambda_func(node)
+
+    @only_required_for_messages('complex-list-comp')
     def visit_listcomp(self, node):  # type: (astroid.ListComp) -> None
-        self.__use_simple_list_comp(node)
+        if not self.__replayed:
+            self.__use_simple_list_comp(node)
 
+    @only_required_for_messages('try-too-long', 'except-too-long')
     def visit_tryexcept(self, node):  # type: (astroid.TryExcept) -> None
-        self.__minimize_code_in_try_except(node)
+        if not self.__replayed:
+            self.__minimize_code_in_try_except(node)
 
+    @only_required_for_messages('finally-too-long')
     def visit_tryfinally(self, node):  # type: (astroid.TryFinally) -> None
-        self.__minimize_code_in_finally(node)
+        if not self.__replayed:
+            self.__minimize_code_in_finally(node)
 
+    @only_required_for_messages('import-modules-only', 'import-full-path', 'multiple-import-items')
     def visit_importfrom(self, node):  # type: (astroid.ImportFrom) -> None
-        self.__import_modules_only(node)
-        self.__import_full_path_only(node)
-        self.__limit_one_import(node)
-
+        if 'import-modules-only' in self.__enabled_messages:
+            self.__import_modules_only(node)
+        if 'import-full-path' in self.__enabled_messages:
+            self.__import_full_path_only(node)
+        if 'multiple-import-items' in self.__enabled_messages:
+            self.__limit_one_import(node)
+
+    @only_required_for_messages('two-arg-exception', 'string-exception')
     def visit_raise(self, node):  # type: (astroid.Raise) -> None
-        self.__dont_use_archaic_raise_syntax(node)
+        if not self.__replayed:
+            self.__dont_use_archaic_raise_syntax(node)
 
-    def visit_if(self, node):
-        self.__use_cond_expr(node)  # type: (astroid.If) -> None
+    @only_required_for_messages('cond-expr')
+    def visit_if(self, node):  # type: (astroid.If) -> None
+        if not self.__replayed:
+            self.__use_cond_expr(node)
 
     def visit_classdef(self, node):  # type: (astroid.ClassDef) -> None
-        self.__class_def_check(node)
+        self.__enter_definition(node)
+        if 'blank-line-after-class-required' in self.__enabled_messages and not self.__replayed:
+            self.__class_def_check(node)
+
+    def __enter_definition(self, node):  # type: (astroid.NodeNG) -> None
+        """Replay the messages of a top-level definition checked before with the same source, or record them.
+
+        While replayed, the visitors of the checks local to the definition skip its nodes.
+        """
+        if self.definition_cache is None or self.__source_lines is None or not isinstance(node.parent, astroid.Module):
+            return
+        first_line = node.decorators.fromlineno if node.decorators else node.fromlineno
+        key = shopify_python.definition_cache.definition_key(
+            self.__source_lines[first_line - 1:node.tolineno], self.__settings_fingerprint)
+        messages = self.definition_cache.get(key)
+        if messages is None:
+            self.__definition = _VisitedDefinition(node, first_line, key, [])
+            return
+        message_nodes = [self.__message_node(node, message.node_type, first_line + message.line, message.column)
+                         for message in messages]
+        if None in message_nodes:
+            # The source is the same but its tree isn't, e.g. parsed by another version of astroid: check it afresh
+            self.__definition = _VisitedDefinition(node, first_line, key, [])
+            return
+        self.__definition = _VisitedDefinition(node, first_line, key, None)
+        for message, message_node in zip(messages, message_nodes):
+            self.add_message(message.symbol, node=message_node, args=message.args)
+
+    @staticmethod
+    def __message_node(definition, node_type, line, column):
+        # type: (astroid.NodeNG, str, int, int) -> typing.Optional[astroid.NodeNG]
+        """The node of definition a cached message is about, if there is one."""
+        node_class = getattr(astroid, node_type, None)
+        if node_class is None:
+            return None
+        return next((candidate for candidate in definition.nodes_of_class(node_class)
+                     if candidate.fromlineno == line and candidate.col_offset == column), None)
+
+    def __leave_definition(self, node):  # type: (astroid.NodeNG) -> None
+        if self.__definition is None or self.__definition.node is not node:
+            return
+        if self.__recording:
+            self.definition_cache.set(self.__definition.key, self.__definition.messages)
+        self.__definition = None
+
+    @property
+    def __recording(self):  # type: () -> bool
+        """Whether the top-level definition being visited is checked, recording its messages."""
+        return self.__definition is not None and self.__definition.messages is not None
+
+    @property
+    def __replayed(self):  # type: () -> bool
+        """Whether the top-level definition being visited got its messages from the cache, so needn't be checked."""
+        return self.__definition is not None and self.__definition.messages is None
+
+    def __class_and_const_regexps(self):  # type: () -> typing.Tuple[typing.Pattern, typing.Pattern]
+        """The regexps class and constant names must match, per the naming options of the linter."""
+        key = tuple(getattr(self.linter.config, option, None) for option in (
+            'class_naming_style', 'class_rgx', 'const_naming_style', 'const_rgx'))
+        if key not in self.__naming_regexps:
+            name_checker = checkers.base.NameChecker(self.linter)
+            (regexps, _) = name_checker._create_naming_rules()  # pylint: disable=protected-access
+            self.__naming_regexps[key] = (regexps['class'], regexps['const'])
+        return self.__naming_regexps[key]
+
+    def __suppressed(self, symbol, node):  # type: (str, astroid.NodeNG) -> bool
+        """Whether a pragma disables the message on the line it would be reported at for node.
+
+        pylint has gathered the module's pragmas into line ranges before the checks run, so this is a couple of
+        lookups; asking first lets checks skip work whose message would be dropped anyway.
+        """
+        if self.__recording and symbol in self.DEFINITION_LOCAL_MESSAGES:
+            return False  # Recorded whatever the pragmas, which may change outside the definition
+        return not self.linter.is_message_enabled(symbol, node.fromlineno)
+
+    @staticmethod
+    def __exceeds_size(nodes, limit):  # type: (typing.Sequence[astroid.NodeNG], int) -> bool
+        """Whether the subtrees rooted at nodes hold more than limit nodes, counting no further than needed."""
+        remaining = limit
+        for node in nodes:
+            remaining -= shopify_python.ast.count_tree_size(node, limit=remaining)
+            if remaining < 0:
+                return True
+        return False
+
+    @staticmethod
+    def __trees_size(nodes):  # type: (typing.Sequence[astroid.NodeNG]) -> int
+        """Exact number of nodes in the subtrees rooted at nodes, for message text once they exceed their limit."""
+        return sum(shopify_python.ast.count_tree_size(node) for node in nodes)
 
     @staticmethod
     def __get_module_names(node):  # type: (astroid.ImportFrom) -> typing.Generator[str, None, None]
@@ -197,7 +422,7 @@ class GoogleStyleGuideChecker(checkers.BaseChecker):
         """Use imports for packages and modules only."""
         matches_ignored_module = any((node.modname.startswith(module_name) for module_name in
                                       self.config.ignore_module_import_only))  # pylint: disable=no-member
-        if not node.level and not matches_ignored_module:
+        if not node.level and not matches_ignored_module and not self.__suppressed('import-modules-only', node):
             # Walk up the parents until we hit one that can import a module (e.g. a module)
             parent = node.parent
             while not hasattr(parent, 'import_module'):
@@ -205,14 +430,8 @@ class GoogleStyleGuideChecker(checkers.BaseChecker):
 
             # Warn on each imported name (yi) in "from x import y1, y2, y3"
             for child_module in self.__get_module_names(node):
-                args = {'child': child_module}
-                try:
-                    parent.import_module(child_module)
-                except astroid.exceptions.AstroidImportError as building_exception:
-                    if str(building_exception).startswith('Failed to import module'):
-                        self.add_message('import-modules-only', node=node, args=args)
-                    else:
-                        raise
+                if not self.import_resolver.is_module(parent, child_module):
+                    self.add_message('import-modules-only', node=node, args={'child': child_module})
 
     def __import_full_path_only(self, node):  # type: (astroid.ImportFrom) -> None
         """Import each module using the full pathname location of the module."""
@@ -229,11 +448,15 @@ class GoogleStyleGuideChecker(checkers.BaseChecker):
         """Avoid global variables."""
 
         def check_assignment(node):
+            if self.__suppressed('global-variable', node):
+                return
+
+            class_regexp, const_regexp = self.__class_and_const_regexps()
 
-            if self.__class_regexp.match(node.name):
+            if class_regexp.match(node.name):
                 return  # Type definitions are allowed if they assign to a class name
 
-            if self.__const_regexp.match(node.name) or re.match('^__[a-z]+__$', node.name):
+            if const_regexp.match(node.name) or re.match('^__[a-z]+__$', node.name):
                 return  # Constants are allowed
 
             self.add_message('global-variable', node=node, args={'name': node.name})
@@ -268,24 +491,26 @@ class GoogleStyleGuideChecker(checkers.BaseChecker):
 
     def __minimize_code_in_try_except(self, node):  # type: (astroid.TryExcept) -> None
         """Minimize the amount of code in a try/except block."""
-        try_body_nodes = sum((shopify_python.ast.count_tree_size(child) for child in node.body))
-        if try_body_nodes > self.config.max_try_nodes:  # pylint: disable=no-member
-            self.add_message('try-too-long', node=node, args={'found': try_body_nodes})
+        if (not self.__suppressed('try-too-long', node) and
+                self.__exceeds_size(node.body, self.config.max_try_nodes)):  # pylint: disable=no-member
+            self.add_message('try-too-long', node=node, args={'found': self.__trees_size(node.body)})
         for handler in node.handlers:
-            except_nodes = shopify_python.ast.count_tree_size(handler)
-            if except_nodes > self.config.max_except_nodes:  # pylint: disable=no-member
-                self.add_message('except-too-long', node=handler, args={'found': except_nodes})
+            if (not self.__suppressed('except-too-long', handler) and
+                    self.__exceeds_size([handler], self.config.max_except_nodes)):  # pylint: disable=no-member
+                self.add_message('except-too-long', node=handler, args={'found': self.__trees_size([handler])})
 
     def __minimize_code_in_finally(self, node):  # type: (astroid.TryFinally) -> None
         """Minimize the amount of code in a finally block."""
-        finally_body_nodes = sum((shopify_python.ast.count_tree_size(child) for child in node.finalbody))
-        if finally_body_nodes > self.config.max_finally_nodes:  # pylint: disable=no-member
-            self.add_message('finally-too-long', node=node, args={'found': finally_body_nodes})
+        if self.__suppressed('finally-too-long', node):
+            return
+        if self.__exceeds_size(node.finalbody, self.config.max_finally_nodes):  # pylint: disable=no-member
+            self.add_message('finally-too-long', node=node, args={'found': self.__trees_size(node.finalbody)})
 
     def __use_simple_lambdas(self, node):  # type: (astroid.Lambda) -> None
-        lambda_nodes = shopify_python.ast.count_tree_size(node)
-        if lambda_nodes > self.config.max_lambda_nodes:  # pylint: disable=no-member
-            self.add_message('use-simple-lambdas', node=node, args={'found': lambda_nodes})
+        if self.__suppressed('use-simple-lambdas', node):
+            return
+        if self.__exceeds_size([node], self.config.max_lambda_nodes):  # pylint: disable=no-member
+            self.add_message('use-simple-lambdas', node=node, args={'found': self.__trees_size([node])})
 
     def __use_simple_list_comp(self, node):  # type: (astroid.ListComp) -> None
         """List comprehensions are okay to use for simple cases."""
@@ -317,7 +542,7 @@ class GoogleStyleGuideChecker(checkers.BaseChecker):
                 op_fun = "operator." + operator
                 self.add_message('lambda-func', node=node, args={'op': op_fun, 'lambda_fun': lambda_fun})
         elif isinstance(node.body, astroid.BinOp):
-            if shopify_python.ast.count_tree_size(node.body) == 3 and len(node.args.args) == 2:
+            if shopify_python.ast.count_tree_size(node.body, limit=3) == 3 and len(node.args.args) == 2:
                 node = node.body
                 operator = self.BINARY_OPERATORS.get(node.op)
                 if operator:
@@ -327,7 +552,7 @@ class GoogleStyleGuideChecker(checkers.BaseChecker):
                     op_fun = "operator." + operator
                     self.add_message('lambda-func', node=node, args={'op': op_fun, 'lambda_fun': lambda_fun})
         elif isinstance(node.body, astroid.Compare):
-            if shopify_python.ast.count_tree_size(node.body) == 3 and len(node.args.args) == 2:
+            if shopify_python.ast.count_tree_size(node.body, limit=3) == 3 and len(node.args.args) == 2:
                 node = node.body
                 operator = self.BINARY_OPERATORS.get(node.ops[0][0])
                 if operator:
@@ -350,3 +575,8 @@ class GoogleStyleGuideChecker(checkers.BaseChecker):
             elif isinstance(element, astroid.FunctionDef):
                 break
             prev_line = curr_line
+
+
+# A top-level definition being visited, with the first line of its source (its decorators' if any), its key in the
+# definition cache, and the messages recorded while it is checked (None when they were replayed from the cache)
+_VisitedDefinition = collections.namedtuple('_VisitedDefinition', ['node', 'first_line', 'key', 'messages'])
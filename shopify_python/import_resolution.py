@@ -0,0 +1,453 @@
+"""Caching of the module resolutions made by the import-modules-only check."""
+
+import contextlib
+import hashlib
+import importlib.machinery
+import io
+import json
+import mmap
+import multiprocessing.pool
+import os
+import site
+import sys
+import sysconfig
+import tempfile
+import typing  # pylint: disable=unused-import
+
+import astroid
+
+
+# Entries of a search path directory that hold the metadata of an installed distribution, e.g. name-1.0.dist-info
+_DISTRIBUTION_SUFFIXES = ('.dist-info', '.egg-info', '.egg-link', '.egg', '.pth')
+
+
+def environment_fingerprint(paths=None):  # type: (typing.Optional[typing.List[str]]) -> str
+    """Hash the module search path and the metadata entries of the distributions installed on it.
+
+    Resolutions of installed modules can only change when one of these does. The names and modification times of the
+    metadata entries change whenever a distribution is installed, upgraded or removed, and listing them is much
+    cheaper than reading the metadata itself.
+    """
+    hasher = hashlib.sha1()
+    for path in sys.path if paths is None else paths:
+        hasher.update(path.encode('utf-8') + b'\0')
+        try:
+            entries = list(os.scandir(path or os.curdir))
+        except OSError:
+            continue  # Not a directory (e.g. a zip file) or no longer there
+        for name, modified in sorted((entry.name, entry.stat().st_mtime_ns) for entry in entries
+                                     if entry.name.endswith(_DISTRIBUTION_SUFFIXES)):
+            hasher.update(os.fsencode(name) + '@{}'.format(modified).encode('ascii') + b'\0')
+    return hasher.hexdigest()
+
+
+def installation_roots():  # type: () -> typing.Tuple[str, ...]
+    """Directories holding the standard library and installed distributions."""
+    roots = set(path for name, path in sysconfig.get_paths().items()
+                if name in ('stdlib', 'platstdlib', 'purelib', 'platlib'))
+    roots.update(getattr(site, 'getsitepackages', lambda: [])())
+    roots.add(getattr(site, 'getusersitepackages', lambda: '')())
+    return tuple(os.path.join(os.path.realpath(root), '') for root in roots if root)
+
+
+def _is_installed(name):  # type: (str) -> bool
+    """Whether the top-level package of a dotted name is built in or lives among the installed distributions.
+
+    Modules of the code base being linted live elsewhere, and can appear or disappear without the fingerprint
+    changing, so their resolutions must not outlive a run.
+    """
+    return name.split('.', 1)[0] in sys.builtin_module_names or _found_under(name, installation_roots())
+
+
+def _found_under(name, roots):  # type: (str, typing.Tuple[str, ...]) -> bool
+    """Whether the top-level package of a dotted name, as found on sys.path, lives in the roots (ending with os.sep)."""
+    spec = importlib.machinery.PathFinder.find_spec(name.split('.', 1)[0])
+    if spec is None:
+        return False
+    locations = list(spec.submodule_search_locations or []) or [spec.origin]
+    return all(location and os.path.realpath(location).startswith(roots) for location in locations)
+
+
+def write_atomically(path, content):  # type: (str, bytes) -> None
+    """Replace the file at path with content, so that concurrent readers never see a partially written file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with io.open(file_descriptor, 'wb') as temporary_file:
+        temporary_file.write(content)
+    os.replace(temporary_path, path)
+
+
+def load_json(path):  # type: (str) -> typing.Any
+    """The content of the JSON file at path, or None if it is missing or unreadable."""
+    try:
+        with io.open(path, encoding='utf-8') as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+
+class ResolutionCache(object):
+    """Whether dotted names are modules, kept in a JSON file per environment fingerprint.
+
+    A change to the module search path or to the installed distributions starts over with an empty file. Only names
+    from installed distributions are stored. Several processes can share a directory: save adds new results to the
+    ones on disk.
+    """
+
+    def __init__(self, directory):  # type: (str) -> None
+        self.path = os.path.join(directory, environment_fingerprint() + '.json')
+        self.__results = load_json(self.path) or {}  # type: typing.Dict[str, bool]
+        self.__new_results = {}  # type: typing.Dict[str, bool]
+
+    def __len__(self):  # type: () -> int
+        return len(self.__results)
+
+    def get(self, name):  # type: (str) -> typing.Optional[bool]
+        """Return whether name is a module, or None if that isn't known."""
+        return self.__results.get(name)
+
+    def set(self, name, is_module):  # type: (str, bool) -> None
+        if _is_installed(name):
+            self.__results[name] = is_module
+            self.__new_results[name] = is_module
+
+    def save(self):  # type: () -> None
+        """Add the new results to those on disk, which other processes may have added to, and write them back."""
+        if self.__new_results:
+            self.__results = dict(load_json(self.path) or {}, **self.__new_results)
+            write_atomically(self.path, json.dumps(self.__results, sort_keys=True).encode('utf-8'))
+            self.__new_results = {}
+
+
+class SpecFinder(object):  # pylint: disable=too-few-public-methods
+    """Decides whether dotted names are modules by looking for their files, without parsing or importing anything.
+
+    Follows the path-based import system: a name is found as a regular package (a directory with an __init__ file),
+    a module (.py, .pyi, bytecode or extension module file) or a portion of a namespace package, and submodules are
+    looked up in the directories of the package above them. Directory listings are cached for the lifetime of the
+    finder.
+
+    find returns None for the cases only a real import can settle, such as top-level names not found on disk (which
+    may come from zip files or import hooks) or attributes registered as modules at runtime (e.g. os.path).
+
+    Like astroid resolving an absolute import, top-level names are only looked up on sys.path, never in the directory
+    of the importing module, so the answer for a name is the same whichever module imports it.
+    """
+
+    MODULE_SUFFIXES = tuple(importlib.machinery.all_suffixes()) + ('.pyi',)
+
+    def __init__(self):  # type: () -> None
+        self.__listings = {}  # type: typing.Dict[str, typing.Dict[str, bool]]
+
+    def find(self, name):  # type: (str) -> typing.Optional[bool]
+        """Return whether name is a module, or None if that can't be told from the file system."""
+        parts = name.split('.')
+        if parts[0] in sys.builtin_module_names:
+            return True if len(parts) == 1 else None
+
+        locations = [path or os.curdir for path in sys.path]
+        if any(os.path.isfile(location) for location in locations):
+            return None  # e.g. a zip file on sys.path
+        for depth, part in enumerate(parts):
+            locations = self.__find_in(locations, part)
+            if locations is None:
+                return None if depth == 0 else False
+            if not locations and depth < len(parts) - 1:
+                # A plain module has no submodules, unless one was put in sys.modules under its name
+                return None if '.'.join(parts[:depth + 2]) in sys.modules else False
+        return True
+
+    def __find_in(self, locations, name):
+        # type: (typing.List[str], str) -> typing.Optional[typing.List[str]]
+        """Find name in the given directories.
+
+        Returns the directories of the package, an empty list if it's a plain module, or None if it isn't found.
+        """
+        namespace_portions = []
+        for location in locations:
+            listing = self.__listing(location)
+            if listing.get(name):
+                package_directory = os.path.join(location, name)
+                if any(not is_directory and entry.startswith('__init__.') and entry[8:] in self.MODULE_SUFFIXES
+                       for entry, is_directory in self.__listing(package_directory).items()):
+                    return [package_directory]
+            if any(listing.get(name + suffix) is False for suffix in self.MODULE_SUFFIXES):
+                return []
+            if listing.get(name):
+                namespace_portions.append(os.path.join(location, name))
+        return namespace_portions or None
+
+    def __listing(self, directory):  # type: (str) -> typing.Dict[str, bool]
+        """The entries of a directory, mapped to whether each of them is a directory."""
+        try:
+            return self.__listings[directory]
+        except KeyError:
+            pass
+        listing = {}  # type: typing.Dict[str, bool]
+        try:
+            for entry in os.scandir(directory):
+                try:
+                    listing[entry.name] = entry.is_dir()
+                except OSError:
+                    continue
+        except OSError:
+            pass
+        self.__listings[directory] = listing
+        return listing
+
+
+def indexed_directories():  # type: () -> typing.List[str]
+    """The sys.path entries holding the standard library and installed distributions, which ModuleNameIndex covers."""
+    roots = installation_roots()
+    directories = []  # type: typing.List[str]
+    for path in sys.path:
+        path = os.path.realpath(path or os.curdir)
+        if os.path.isdir(path) and os.path.join(path, '').startswith(roots) and path not in directories:
+            directories.append(path)
+    return directories
+
+
+class ModuleNameIndex(object):
+    """A sorted table of every dotted module name importable from a set of directories, stored in a file.
+
+    The file is memory-mapped and searched by bisection, so lookups cost O(log n) without reading the whole table,
+    and it can be shared by any number of lint processes. Its header records the indexed directories and a fingerprint
+    of them (their paths and modification times, which change as distributions are installed or removed), so a stale
+    index is detected and rebuilt.
+
+    Build or refresh an index for the current sys.path with:
+
+        python -m shopify_python.import_resolution INDEX_PATH
+    """
+
+    MAGIC = b'shopify_python module index 2'
+
+    def __init__(self, path):  # type: (str) -> None
+        """Open the index stored at path. Raises ValueError if the file isn't one."""
+        with io.open(path, 'rb') as index_file:
+            header = index_file.readline()
+            magic, _, fingerprint = header.rstrip(b'\n').rpartition(b' ')
+            if magic != self.MAGIC:
+                raise ValueError('{} is not a module index'.format(path))
+            directories = index_file.readline()
+            self.path = path
+            self.fingerprint = fingerprint.decode('ascii')
+            self.directories = json.loads(directories.decode('utf-8'))  # type: typing.List[str]
+            self.__start = len(header) + len(directories)
+            self.__map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__roots = tuple(os.path.join(os.path.realpath(directory), '') for directory in self.directories)
+        self.__indexed_top_levels = {}  # type: typing.Dict[str, bool]
+
+    @classmethod
+    def build(cls, path, directories=None):  # type: (str, typing.Optional[typing.List[str]]) -> ModuleNameIndex
+        """Scan directories (by default indexed_directories()) and write their index to path."""
+        directories = indexed_directories() if directories is None else directories
+        names = set()  # type: typing.Set[str]
+        for directory in directories:
+            cls.__scan(directory, '', names, set())
+        content = [cls.MAGIC + b' ' + cls.directories_fingerprint(directories).encode('ascii'),
+                   json.dumps(directories).encode('utf-8')]
+        content.extend(sorted(name.encode('utf-8') for name in names))
+        write_atomically(path, b'\n'.join(content) + b'\n')
+        return cls(path)
+
+    @classmethod
+    def load(cls, path, directories=None):  # type: (str, typing.Optional[typing.List[str]]) -> ModuleNameIndex
+        """Open the index stored at path, (re)building it first if it is missing or out of date."""
+        directories = indexed_directories() if directories is None else directories
+        try:
+            index = cls(path)
+        except (OSError, ValueError):
+            return cls.build(path, directories)
+        if index.fingerprint != cls.directories_fingerprint(directories):
+            index.close()
+            return cls.build(path, directories)
+        return index
+
+    @staticmethod
+    def directories_fingerprint(directories):  # type: (typing.List[str]) -> str
+        hasher = hashlib.sha1()
+        for directory in directories:
+            try:
+                modified = os.stat(directory).st_mtime_ns
+            except OSError:
+                modified = -1
+            hasher.update('{}\0{}\0'.format(directory, modified).encode('utf-8'))
+        return hasher.hexdigest()
+
+    @classmethod
+    def __scan(cls, directory, prefix, names, visited):
+        # type: (str, str, typing.Set[str], typing.Set[str]) -> None
+        real_directory = os.path.realpath(directory)
+        if real_directory in visited:
+            return  # A symbolic link loop
+        visited.add(real_directory)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                is_directory = entry.is_dir()
+            except OSError:
+                continue
+            if is_directory:
+                if entry.name.isidentifier() and entry.name != '__pycache__':
+                    names.add(prefix + entry.name)  # A regular package or a namespace package portion
+                    cls.__scan(entry.path, prefix + entry.name + '.', names, visited)
+            else:
+                for suffix in SpecFinder.MODULE_SUFFIXES:
+                    stem = entry.name[:-len(suffix)]
+                    if entry.name.endswith(suffix) and stem.isidentifier() and stem != '__init__':
+                        names.add(prefix + stem)
+                        break
+
+    def __len__(self):  # type: () -> int
+        return self.__map[self.__start:].count(b'\n')
+
+    def __contains__(self, name):  # type: (str) -> bool
+        key = name.encode('utf-8')
+        low, high = self.__start, len(self.__map)  # Always the start of a line, and the end of a line (or the table)
+        while low < high:
+            newline = self.__map.rfind(b'\n', low, (low + high) // 2)
+            line_start = newline + 1 if newline >= 0 else low
+            line_end = self.__map.find(b'\n', line_start)
+            line = self.__map[line_start:line_end]
+            if line == key:
+                return True
+            if line < key:
+                low = line_end + 1
+            else:
+                high = line_start
+        return False
+
+    def find(self, name):  # type: (str) -> typing.Optional[bool]
+        """Return whether name is a module, or None if it doesn't belong to the indexed directories.
+
+        That includes names whose top-level package is found elsewhere on sys.path first, e.g. a copy of an installed
+        package in the code being linted, as the index can't tell what that copy holds.
+        """
+        top_level = name.split('.', 1)[0]
+        if top_level not in self.__indexed_top_levels:
+            self.__indexed_top_levels[top_level] = top_level in self and _found_under(top_level, self.__roots)
+        if not self.__indexed_top_levels[top_level]:
+            return None
+        if name in self:
+            return True
+        return None if name in sys.modules else False  # Registered as a module at runtime (e.g. os.path)
+
+    def close(self):  # type: () -> None
+        self.__map.close()
+
+
+# The dotted names to prefetch in the resolvers configured while a prefetching block runs
+_PREFETCH_REQUESTS = []  # type: typing.List[typing.Set[str]]
+
+
+@contextlib.contextmanager
+def prefetching(names):  # type: (typing.Set[str]) -> typing.Iterator[None]
+    """Have the import-modules-only checks opened while the block runs prefetch names (see ImportResolver.prefetch)."""
+    _PREFETCH_REQUESTS.append(names)
+    try:
+        yield
+    finally:
+        _PREFETCH_REQUESTS.remove(names)
+
+
+def requested_prefetches():  # type: () -> typing.Set[str]
+    """The names of the prefetching blocks running, for a resolver being configured to prefetch."""
+    return set().union(*_PREFETCH_REQUESTS)
+
+
+class ImportResolver(object):
+    """Decides whether dotted names are modules, remembering every answer for the rest of the run.
+
+    Each name is resolved through astroid's import machinery at most once per resolver; repeated names are answered
+    from an in-memory table of positive and negative results. An optional ResolutionCache is consulted before
+    astroid and filled with its answers.
+
+    With a SpecFinder, names are resolved from the file system, and astroid is only used for the names the finder
+    can't decide. A ModuleNameIndex answers for the standard library and installed distributions before either.
+    Answers that don't need astroid can be prefetched concurrently for all the names a run will ask about.
+    """
+
+    def __init__(self,
+                 cache=None,  # type: typing.Optional[ResolutionCache]
+                 finder=None,  # type: typing.Optional[SpecFinder]
+                 index=None,  # type: typing.Optional[ModuleNameIndex]
+                 ):
+        # type: (...) -> None
+        self.cache = cache
+        self.finder = finder
+        self.index = index
+        self.hits = 0
+        self.misses = 0
+        self.__results = {}  # type: typing.Dict[str, bool]
+
+    def is_module(self, importer, name):  # type: (astroid.Module, str) -> bool
+        """Return whether name, as imported by the module importer, is a module."""
+        is_module = self.__results.get(name)
+        if is_module is not None:
+            self.hits += 1
+            return is_module
+        self.misses += 1
+
+        is_module = self.__find(name)
+        if is_module is None:
+            is_module = self.__import(importer, name)
+            if self.cache is not None:
+                self.cache.set(name, is_module)
+        self.__results[name] = is_module
+        return is_module
+
+    def prefetch(self, names, jobs=None):  # type: (typing.Iterable[str], typing.Optional[int]) -> None
+        """Resolve many dotted names concurrently, ahead of the checks asking about them.
+
+        The names are looked up in the cache, index and finder by a pool of jobs threads (by default one per CPU).
+        Names none of them can decide are left to astroid, which isn't thread-safe, for when a check asks about them.
+        """
+        if self.cache is None and self.index is None and self.finder is None:
+            return
+        names = sorted(name for name in set(names) if name not in self.__results)
+        if not names:
+            return
+        pool = multiprocessing.pool.ThreadPool(jobs)
+        try:
+            resolved = pool.map(self.__find, names)
+        finally:
+            pool.close()
+            pool.join()
+        self.__results.update((name, is_module) for name, is_module in zip(names, resolved) if is_module is not None)
+
+    def __find(self, name):  # type: (str) -> typing.Optional[bool]
+        """Whether name is a module, or None if no cache, index or finder knows."""
+        is_module = self.cache.get(name) if self.cache is not None else None
+        if is_module is None and self.index is not None:
+            is_module = self.index.find(name)
+        if is_module is None and self.finder is not None:
+            is_module = self.finder.find(name)
+        return is_module
+
+    @staticmethod
+    def __import(importer, name):  # type: (astroid.Module, str) -> bool
+        try:
+            importer.import_module(name)
+        except astroid.exceptions.AstroidImportError as building_exception:
+            if str(building_exception).startswith('Failed to import module'):
+                return False
+            raise
+        return True
+
+
+def main(argv=None):  # type: (typing.Optional[typing.List[str]]) -> int
+    for path in sys.argv[1:] if argv is None else argv:
+        index = ModuleNameIndex.load(path)
+        print('{}: {} modules'.format(path, len(index)))
+        index.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""The Shopify style rules that only look at the tokens of a module.
+
+disable-name-only and sequence-of-string are decided from comments and names alone. ShopifyStyleGuideChecker applies
+them in pylint with the functions below, and this module applies them to files (see quick_pass), honouring the files'
+`# pylint:` pragmas as pylint would:
+
+    python -m shopify_python.lexical_rules [path ...]
+"""
+
+import collections
+import contextlib
+import io
+import mmap
+import os
+import re
+import sys
+import tokenize
+import typing  # pylint: disable=unused-import
+
+from shopify_python import known_messages
+from shopify_python import quick_pass
+
+MESSAGES = {
+    'C6101': ("%(code)s disabled as a message code, use '%(name)s' instead",
+              'disable-name-only',
+              "Disable pylint rules via message name (e.g. unused-import) and not message code (e.g. W0611) to "
+              "help code reviewers understand why a linter rule was disabled for a line of code."),
+    'C6102': ('Forbidden use of typing.Sequence[str], use typing.List[str] or some specific collection instead',
+              'sequence-of-string',
+              'Since str itself also satisfies typing.Sequence[str], the latter should be replaced by '
+              'a more specific iterable type, such as typing.List[str]')
+}
+
+SYMBOLS = ('disable-name-only', 'sequence-of-string')
+
+# The name of ShopifyStyleGuideChecker, which pragmas can use for all of its rules
+CHECKER_NAME = 'shopify-styleguide-checker'
+
+RE_PYLINT_DISABLE = re.compile(r'^#[ \t]*pylint:[ \t]*(disable|enable)[ \t]*=(?P<messages>[a-zA-Z0-9\-_, \t]+)$')
+RE_PYLINT_MESSAGE_CODE = re.compile(r'^[A-Z]{1,2}[0-9]{4}$')
+
+RE_COMMENT_TYPE_ANNOTATION = re.compile(r'^# type.*:.*$')
+RE_SEQUENCE_STRING = re.compile(r'^.*Sequence\[str\].*$')
+
+# Every line that can hold a message contains one of these
+RE_LINE_MARKERS = re.compile(br'pylint:|Sequence\[str\]')
+
+# The pragmas of a comment, and their keywords and the messages they name, as pylint parses them
+RE_PRAGMAS = re.compile(r'#.*?\bpylint:[ \t]*(?P<pragmas>[^;#]+)')
+RE_PRAGMA_TOKEN = re.compile(r'(?P<keyword>\b(?:disable-next|disable-all|disable-msg|enable-msg|skip-file|disable|'
+                             r'enable)\b)|(?P<name>[\w\-]+)')
+
+# code is the message code for disable-name-only, None otherwise
+LexicalMessage = collections.namedtuple('LexicalMessage', ['symbol', 'line', 'code'])
+
+_TRY_CLAUSES = ('except', 'else', 'finally')
+
+# What pragmas can name each rule by
+_PRAGMA_NAMES = {symbol: {code.lower(), symbol, code[0].lower(), CHECKER_NAME, 'all'}
+                 for code, (_, symbol, _) in MESSAGES.items()}
+
+# What pragmas set at a line: whether each rule is enabled
+_States = typing.Dict[str, bool]
+
+
+def marked_lines(source):  # type: (typing.Union[bytes, mmap.mmap]) -> typing.Set[int]
+    """The numbers of the lines of source that contain one of the RE_LINE_MARKERS."""
+    lines = set()  # type: typing.Set[int]
+    line_number, counted_up_to = 1, 0
+    for match in RE_LINE_MARKERS.finditer(source):
+        line_number += source[counted_up_to:match.start()].count(b'\n')  # mmap has no count
+        counted_up_to = match.start()
+        lines.add(line_number)
+    return lines
+
+
+def lexical_messages(tokens,  # type: typing.Iterable[typing.Tuple]
+                     symbols=SYMBOLS,  # type: typing.Container[str]
+                     lines_to_check=None,  # type: typing.Optional[typing.Set[int]]
+                     ):
+    # type: (...) -> typing.Generator[LexicalMessage, None, None]
+    """Apply the rules to tokens, optionally only to those on the given lines.
+
+    Pragmas are not looked at: pylint applies them to the messages itself, see Pragmas otherwise.
+    """
+    for _type, string, start, _, line in tokens:
+        start_row, _ = start
+        if lines_to_check is not None and start_row not in lines_to_check:
+            continue
+        if _type == tokenize.NAME:
+            if 'sequence-of-string' in symbols and string == 'Sequence' and 'Sequence[str]' in line and \
+                    RE_SEQUENCE_STRING.match(line):
+                yield LexicalMessage('sequence-of-string', start_row, None)
+        elif _type == tokenize.COMMENT:
+            matches = RE_PYLINT_DISABLE.match(string) if 'disable-name-only' in symbols else None
+            if matches:
+                for msg in matches.group('messages').split(','):
+                    msg = msg.strip()
+                    if RE_PYLINT_MESSAGE_CODE.match(msg):
+                        yield LexicalMessage('disable-name-only', start_row, msg)
+            if 'sequence-of-string' in symbols and RE_COMMENT_TYPE_ANNOTATION.match(string) and \
+                    RE_SEQUENCE_STRING.match(string):
+                yield LexicalMessage('sequence-of-string', start_row, None)
+
+
+class _Block(object):  # pylint: disable=too-few-public-methods
+    """The lines of an indented block (or of the module), and the pragmas applying from a line to the block's end."""
+
+    def __init__(self, start):  # type: (int) -> None
+        self.start = start
+        self.end = sys.maxsize  # Until the block is closed
+        self.states = []  # type: typing.List[typing.Tuple[int, _States]]
+
+
+class Pragmas(object):  # pylint: disable=too-many-instance-attributes
+    """Follows the `# pylint:` pragmas through the tokens of a module, to tell where they disable the rules.
+
+    As in pylint, a pragma on a line of its own applies from its line to the end of the block it is in, and
+    disable-next to the next line. A pragma after code applies to its line, and to the block the line opens if
+    nothing on the line but a keyword and a class name (e.g. `try:` or `class Name:`) would make a node of its own to
+    take the pragma, the clauses of a `try:` included. Past the last statement, the last pragma applies whatever its
+    block. Blocks are told apart by their indentation rather than from a syntax tree. A rule is named by its code, its
+    category, the checker's name or 'all' (pylint reads `disable=disable-name-only` as a bare `disable`), and
+    disabling 'all' skips the file like skip-file.
+    """
+
+    def __init__(self):  # type: () -> None
+        self.skip_file = False
+        # Every pragma's line and states, and whether it is on a line of its own (disable-next ones are not)
+        self.__pragmas = []  # type: typing.List[typing.Tuple[int, _States, bool]]
+        self.__blocks = [_Block(1)]  # In the order they open
+        self.__open_blocks = self.__blocks[:]  # Innermost last
+        self.__pending = []  # type: typing.List[typing.Tuple[int, _States]]  # Until their block is known
+        self.__line_tokens = []  # type: typing.List[typing.Tuple[int, str]]  # Those of the current logical line
+        self.__last_line = 0, None  # type: typing.Tuple[int, typing.Optional[str]]  # Its last row and first token
+        # The pragma after the line opening a block on its own, or after a `try:` (with the number of blocks open at its
+        # line) for as long as the try statement lasts
+        self.__opener = None  # type: typing.Optional[typing.Tuple[int, _States, typing.Optional[int]]]
+
+    def followed(self, tokens):
+        # type: (typing.Iterable[typing.Tuple]) -> typing.Generator[typing.Tuple, None, None]
+        """Follow the pragmas through tokens while passing them on."""
+        for token in tokens:
+            self.follow(token)
+            yield token
+
+    def follow(self, token):  # type: (typing.Tuple) -> None
+        _type, string, start, _, line = token
+        start_row, start_column = start
+        if _type == tokenize.COMMENT:
+            self.__follow_comment(start_row, string, not line[:start_column].strip())
+            return
+        if _type == tokenize.NL:
+            return
+        if _type == tokenize.NEWLINE:
+            self.__end_line(start_row)
+        elif _type == tokenize.INDENT:
+            self.__open_block()
+        elif _type == tokenize.DEDENT:
+            self.__open_blocks.pop().end = self.__last_line[0]
+            return  # Blocks may go on closing before the pending pragmas' block is known
+        else:
+            self.__line_tokens.append((_type, string))
+        self.__open_blocks[-1].states.extend(self.__pending)
+        self.__pending = []
+
+    def enabled(self, symbol, line):  # type: (str, int) -> bool
+        """Whether the pragmas followed so far leave the rule named symbol enabled at line."""
+        for row, states, own_line in reversed(self.__pragmas):
+            if row == line and not own_line and symbol in states:
+                return states[symbol]
+        if line > self.__last_line[0]:
+            return next((states[symbol] for row, states, _ in reversed(self.__pragmas)
+                         if row <= line and symbol in states), True)
+        blocks = [block for block in self.__blocks if block.start <= line <= block.end]
+        for block in reversed(blocks):  # Innermost first
+            for row, states in reversed(block.states):
+                if row <= line and symbol in states:
+                    return states[symbol]
+        return True
+
+    def __follow_comment(self, row, comment, own_line):  # type: (int, str, bool) -> None
+        states = self.__states(row, comment)
+        if not states:
+            return
+        self.__pragmas.append((row, states, own_line))
+        if own_line:
+            self.__pending.append((row, states))  # Whether in the block that follows or the one that ends
+            return
+        strings = [string for _, string in self.__line_tokens]
+        if strings in (['try', ':'], ['else', ':'], ['finally', ':']) or \
+                (strings[:1] == ['class'] and len(strings) == 3 and self.__line_tokens[1][0] == tokenize.NAME and
+                 strings[2] == ':'):
+            self.__opener = row, states, len(self.__open_blocks) if strings[0] == 'try' else None
+
+    def __end_line(self, row):  # type: (int) -> None
+        self.__last_line = row, self.__line_tokens[0][1] if self.__line_tokens else None
+        self.__line_tokens = []
+        if self.__opener is not None and self.__opener[2] == len(self.__open_blocks) and \
+                self.__opener[0] != row and self.__last_line[1] not in _TRY_CLAUSES:
+            self.__opener = None  # The try statement is over
+
+    def __open_block(self):  # type: () -> None
+        block = _Block(self.__last_line[0] + 1)
+        if self.__opener is not None and (
+                self.__opener[0] == self.__last_line[0] or
+                self.__opener[2] == len(self.__open_blocks) and self.__last_line[1] in _TRY_CLAUSES):
+            block.states.append(self.__opener[:2])
+        self.__blocks.append(block)
+        self.__open_blocks.append(block)
+
+    def __states(self, row, comment):  # type: (int, str) -> _States
+        """What the pragmas of comment, on line row, set for the rules.
+
+        skip-file and disable-next take effect here instead.
+        """
+        pragmas = RE_PRAGMAS.match(comment)
+        if pragmas is None:
+            return {}
+        states = {}  # type: _States
+        keyword = None
+        for token in RE_PRAGMA_TOKEN.finditer(pragmas.group('pragmas')):
+            if token.group('keyword'):
+                keyword = token.group('keyword').replace('-msg', '')
+                self.skip_file = self.skip_file or keyword in ('skip-file', 'disable-all')
+                continue
+            name = token.group('name').lower()
+            self.skip_file = self.skip_file or (keyword == 'disable' and name == 'all')  # As pylint does
+            for symbol in (symbol for symbol, names in _PRAGMA_NAMES.items() if name in names):
+                if keyword == 'disable-next':
+                    self.__pragmas.append((row + 1, {symbol: False}, False))
+                elif keyword in ('disable', 'enable'):
+                    states[symbol] = keyword == 'enable'
+        return states
+
+
+# How the messages of the installed pylint are named, once message_names has loaded them
+_MESSAGE_NAMES = None  # type: typing.Optional[typing.Mapping[str, str]]
+
+
+def message_names():  # type: () -> typing.Mapping[str, str]
+    """How pylint names message codes: as the installed pylint does if it can be imported, else as known_messages does.
+
+    pylint and this package's checkers are only loaded on the first call, i.e. once a message code needs naming.
+    """
+    global _MESSAGE_NAMES  # pylint: disable=global-statement
+    if _MESSAGE_NAMES is None:
+        try:
+            from shopify_python import shopify_styleguide  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            _MESSAGE_NAMES = known_messages.NAMES
+        else:
+            _MESSAGE_NAMES = shopify_styleguide.default_message_names()
+    return _MESSAGE_NAMES
+
+
+def message_text(message, names=None):  # type: (LexicalMessage, typing.Optional[typing.Mapping[str, str]]) -> str
+    """The text pylint shows for message, naming message codes after names (by default message_names())."""
+    text = next(text for text, symbol, _ in MESSAGES.values() if symbol == message.symbol)
+    if message.code is None:
+        return text
+    names = message_names() if names is None else names
+    return text % {'code': message.code, 'name': names.get(message.code, 'unknown')}
+
+
+def check_file(path):  # type: (str) -> typing.List[LexicalMessage]
+    """Apply the rules to a file, returning the messages pylint would emit.
+
+    The file is memory-mapped and scanned for the lines that might hold a message; it is only tokenized if there are
+    any, and then only tokens on those lines are looked at, besides following the pragmas if it has any.
+    """
+    with io.open(path, 'rb') as source_file:
+        if not os.fstat(source_file.fileno()).st_size:
+            return []
+        with contextlib.closing(mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)) as source:
+            lines_to_check = marked_lines(source)
+            if not lines_to_check:
+                return []
+            tokens = tokenize.tokenize(source.readline)
+            pragmas = Pragmas() if source.find(b'pylint:') != -1 else None
+            try:
+                messages = list(lexical_messages(tokens if pragmas is None else pragmas.followed(tokens),
+                                                 lines_to_check=lines_to_check))
+            except (tokenize.TokenError, SyntaxError):
+                return []  # pylint reports the syntax error instead
+    if pragmas is None:
+        return messages
+    if pragmas.skip_file:
+        return []
+    return [message for message in messages if pragmas.enabled(message.symbol, message.line)]
+
+
+def main(argv=None):  # type: (typing.Optional[typing.List[str]]) -> int
+    """Check files, and the Python files in directories, printing a line per message like pylint's parseable format."""
+    return quick_pass.main(check_file, lambda path, message: '{}:{}: {} ({})'.format(
+        path, message.line, message_text(message), message.symbol), argv)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
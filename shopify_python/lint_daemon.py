@@ -0,0 +1,189 @@
+"""A long-lived process that lints files for clients connecting to a Unix socket, so pylint starts once.
+
+    python -m shopify_python.lint_daemon SOCKET             serve until interrupted
+    python -m shopify_python.lint_daemon SOCKET path ...    lint with the daemon serving at SOCKET
+"""
+
+import contextlib
+import importlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import typing  # pylint: disable=unused-import
+
+import astroid
+import astroid.context
+from pylint import lint  # pylint: disable=unused-import
+from pylint import utils  # pylint: disable=unused-import
+
+from shopify_python import git_utils
+from shopify_python import google_styleguide
+from shopify_python import import_resolution
+
+
+class WarmLinter(object):
+    """Lints files with a linter kept per working directory and pylint arguments, reusing astroid's module trees.
+
+    The first request with some arguments pays for pylint's startup; later ones only check the files. Before every
+    request, where modules are found is forgotten, and the trees of modules whose files changed since they were built
+    are dropped, along with the trees of all modules outside the standard library and installed distributions (whose
+    inferences may depend on the changed ones). A linter is started afresh when its rcfile changes.
+    """
+
+    def __init__(self):  # type: () -> None
+        self.__linters = {}  # type: typing.Dict[tuple, typing.Tuple[str, lint.PyLinter, typing.List[tuple]]]
+        self.__modification_times = {}  # type: typing.Dict[str, float]
+
+    def lint(self, files, pylint_args, directory):
+        # type: (typing.List[str], typing.List[str], str) -> typing.List[tuple]
+        """Lint files as pylint_files would in directory, returning message records (see git_utils)."""
+        os.chdir(directory)  # pylint finds the rcfile, and shows paths, relative to it
+        self.invalidate_changed_modules()
+        # Files may have been added or removed without any module built being modified, so where modules are is
+        # found afresh for every request
+        astroid.MANAGER._mod_file_cache.clear()
+        importlib.invalidate_caches()
+        for _, linter, _ in self.__linters.values():
+            _forget_import_resolutions(linter)
+        try:
+            return self.__lint(files, pylint_args, directory)
+        finally:
+            self.__remember_modification_times()
+
+    def invalidate_changed_modules(self):  # type: () -> bool
+        """Drop the trees of changed modules, and then of all modules outside installations; return whether any."""
+        known_times = self.__modification_times
+        changed = [name for name, module in astroid.MANAGER.astroid_cache.items()
+                   if name in known_times and _modification_time(module) != known_times[name]]
+        if not changed:
+            return False
+
+        roots = import_resolution.installation_roots()
+        for name, module in list(astroid.MANAGER.astroid_cache.items()):
+            if name in changed or (module.file and not os.path.realpath(module.file).startswith(roots)):
+                del astroid.MANAGER.astroid_cache[name]
+                self.__modification_times.pop(name, None)
+        invalidate_inferences = getattr(astroid.context, '_invalidate_cache', None)
+        if invalidate_inferences is not None:
+            invalidate_inferences()
+        return True
+
+    def __lint(self, files, pylint_args, directory):
+        # type: (typing.List[str], typing.List[str], str) -> typing.List[tuple]
+        reporter = git_utils.CustomPylintReporter(io.StringIO())
+        key = (directory,) + tuple(pylint_args)
+        config_fingerprint = git_utils.config_fingerprint(pylint_args)
+        if key in self.__linters and self.__linters[key][0] == config_fingerprint:
+            _, linter, run_records = self.__linters[key]
+            linter.set_reporter(reporter)
+            linter.check(files)
+            return run_records + reporter.records
+
+        linter = git_utils.run_pylint(files, pylint_args, reporter)
+        # Messages about the run itself, such as option errors, are only given when pylint starts
+        arguments = git_utils.ArgumentIndex(files)
+        run_records = [record for record in reporter.records if arguments.find(record) is None]
+        self.__linters[key] = (config_fingerprint, linter, run_records)
+        return reporter.records
+
+    def __remember_modification_times(self):  # type: () -> None
+        """Note when the files of the modules built for a request were modified, to tell later if they changed."""
+        for name, module in astroid.MANAGER.astroid_cache.items():
+            if name not in self.__modification_times:
+                self.__modification_times[name] = _modification_time(module)
+
+
+def _modification_time(module):  # type: (astroid.Module) -> typing.Optional[float]
+    try:
+        return os.path.getmtime(module.file) if module.file else None
+    except OSError:
+        return None  # Deleted
+
+
+def _forget_import_resolutions(linter):  # type: (lint.PyLinter) -> None
+    """Start import-modules-only over, as changed files may add or remove modules."""
+    for checker in linter.get_checkers():
+        if isinstance(checker, google_styleguide.GoogleStyleGuideChecker):
+            resolver = checker.import_resolver
+            checker.import_resolver = import_resolution.ImportResolver(
+                resolver.cache, import_resolution.SpecFinder() if resolver.finder else None, resolver.index)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers a JSON line {"files": [...], "args": [...], "directory": "..."} with {"records": [...]}, or with
+    {"error": "..."} if the request is malformed or linting failed.
+    """
+
+    def handle(self):  # type: () -> None
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            records = self.server.warm_linter.lint(request['files'], request['args'], request['directory'])
+        except Exception as error:  # pylint: disable=broad-except
+            response = {'error': '{}: {}'.format(type(error).__name__, error)}
+        else:
+            response = {'records': [git_utils.record_to_json(record) for record in records]}
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class LintServer(socketserver.UnixStreamServer):
+    """Serves requests one at a time, as pylint and astroid aren't thread-safe."""
+
+    def __init__(self, socket_path):  # type: (str) -> None
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # Left behind by a server that didn't shut down cleanly
+        socketserver.UnixStreamServer.__init__(self, socket_path, _RequestHandler)
+        self.warm_linter = WarmLinter()
+
+    def server_close(self):  # type: () -> None
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+class LintDaemonError(Exception):
+    pass
+
+
+def pylint_files(socket_path, files, **kwargs):
+    # type: (str, typing.List[str], **str) -> typing.Iterable[utils.Message]
+    """Lint files with the daemon serving at socket_path, returning (and reporting) the messages
+    git_utils.pylint_files gives for the same arguments.
+    """
+    request = {'files': files, 'args': git_utils.pylint_arguments(kwargs), 'directory': os.getcwd()}
+    with contextlib.closing(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with contextlib.closing(connection.makefile('rb')) as response_file:
+            response = json.loads(response_file.readline().decode('utf-8'))
+    if 'error' in response:
+        raise LintDaemonError(response['error'])
+
+    reporter = git_utils.CustomPylintReporter()
+    for record in response['records']:
+        reporter.handle_message(git_utils.message_from_record(git_utils.record_from_json(record)))
+    return reporter.raw_messages
+
+
+def main(argv=None):  # type: (typing.Optional[typing.List[str]]) -> int
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(__doc__, file=sys.stderr)
+        return 2
+    if len(argv) > 1:
+        return 1 if pylint_files(argv[0], argv[1:]) else 0
+
+    server = LintServer(argv[0])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Running some of the style rules on files without pylint or astroid.
+
+A few rules only need the tokens or the CPython ast of a module (see lexical_rules and size_rules). Those can be
+applied to files much faster than pylint would, e.g. as a quick pass in a pre-commit hook, with the command line
+main gives them. Neither pylint nor astroid is imported here.
+"""
+
+import os
+import sys
+import typing  # pylint: disable=unused-import
+
+
+def python_files_in(paths):  # type: (typing.Iterable[str]) -> typing.Generator[str, None, None]
+    """Yield the paths that are files, and the Python files in the paths that are directories.
+
+    Directories are walked in sorted order, skipping hidden ones (e.g. .git or .tox). Paths that don't exist, such as
+    module names given to pylint, are skipped.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, directory_names, file_names in os.walk(path):
+                directory_names[:] = sorted(name for name in directory_names if not name.startswith('.'))
+                for file_name in sorted(file_names):
+                    if file_name.endswith('.py'):
+                        yield os.path.join(directory, file_name)
+        elif os.path.isfile(path):
+            yield path
+
+
+def main(check_file,  # type: typing.Callable[[str], typing.Iterable[typing.Any]]
+         message_line,  # type: typing.Callable[[str, typing.Any], str]
+         argv=None,  # type: typing.Optional[typing.List[str]]
+         ):
+    # type: (...) -> int
+    """Check the files of argv (by default sys.argv[1:]), and the Python files in its directories, printing
+    message_line(path, message) for every message check_file(path) gives.
+
+    Return the exit status: 1 if there were messages or a path doesn't exist, else 0.
+    """
+    paths = sys.argv[1:] if argv is None else argv
+    missing_paths = [path for path in paths if not os.path.exists(path)]
+    for path in missing_paths:
+        print('{}: No such file or directory'.format(path), file=sys.stderr)
+
+    found_messages = False
+    for path in python_files_in(paths):
+        for message in check_file(path):
+            found_messages = True
+            print(message_line(path, message))
+    return 1 if found_messages or missing_paths else 0
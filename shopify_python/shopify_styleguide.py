@@ -1,13 +1,17 @@
-import re
-import tokenize
+import io
+import sys
+import types
 import typing  # pylint: disable=unused-import
 
-import pylint.utils
+import astroid  # pylint: disable=unused-import
 
+import pylint
 from pylint import checkers
 from pylint import interfaces
 from pylint import lint  # pylint: disable=unused-import
 
+from shopify_python import lexical_rules
+
 
 def register_checkers(linter):  # type: (lint.PyLinter) -> None
     """Register checkers."""
@@ -18,66 +22,99 @@ class ShopifyStyleGuideChecker(checkers.BaseTokenChecker):
     """
     Pylint checker for Shopify-specific Code Style.
     """
-    __implements__ = (interfaces.ITokenChecker,)
+    __implements__ = (interfaces.ITokenChecker, interfaces.IRawChecker)
+
+    name = lexical_rules.CHECKER_NAME
 
-    name = 'shopify-styleguide-checker'
+    msgs = lexical_rules.MESSAGES
 
-    msgs = {
-        'C6101': ("%(code)s disabled as a message code, use '%(name)s' instead",
-                  'disable-name-only',
-                  "Disable pylint rules via message name (e.g. unused-import) and not message code (e.g. W0611) to "
-                  "help code reviewers understand why a linter rule was disabled for a line of code."),
-        'C6102': ('Forbidden use of typing.Sequence[str], use typing.List[str] or some specific collection instead',
-                  'sequence-of-string',
-                  'Since str itself also satisfies typing.Sequence[str], the latter should be replaced by '
-                  'a more specific iterable type, such as typing.List[str]')
-    }
+    def __init__(self, linter=None):  # type: (lint.PyLinter) -> None
+        super(ShopifyStyleGuideChecker, self).__init__(linter)
+        self.__lines_to_check = None  # type: typing.Optional[typing.Set[int]]
+        self.__message_names = None  # type: typing.Optional[typing.Mapping[str, str]]
 
-    RE_PYLINT_DISABLE = re.compile(r'^#[ \t]*pylint:[ \t]*(disable|enable)[ \t]*=(?P<messages>[a-zA-Z0-9\-_, \t]+)$')
-    RE_PYLINT_MESSAGE_CODE = re.compile(r'^[A-Z]{1,2}[0-9]{4}$')
+    def process_module(self, node):
+        # type: (astroid.Module) -> None
+        """Find the lines process_tokens needs to look at with a single scan of the raw source.
 
-    RE_COMMENT_TYPE_ANNOTATION = re.compile(r'^# type.*:.*$')
-    RE_SEQUENCE_STRING = re.compile(r'^.*Sequence\[str\].*$')
+        pylint calls this before process_tokens; without it, every token is looked at.
+        """
+        stream = node.stream()
+        if stream is None:
+            self.__lines_to_check = None
+            return
+        with stream:
+            self.__lines_to_check = lexical_rules.marked_lines(stream.read())
 
     def process_tokens(self, tokens):
         # type: (typing.Sequence[typing.Tuple]) -> None
-        for _type, string, start, _, line in tokens:
-            if _type == tokenize.NAME:
-                self.__validate_name(string, start, line)
-            elif _type == tokenize.COMMENT:
-                self.__validate_comment(string, start)
-
-    def __validate_comment(self, string, start):
-        # type: (str, typing.Tuple[int, int]) -> None
-        self.__disable_name_only(string, start)
-        if self.RE_COMMENT_TYPE_ANNOTATION.match(string):
-            self.__sequence_str(string, start)
-
-    def __validate_name(self, string, start, line):
-        # type: (str, typing.Tuple[int, int], str) -> None
-        if string == 'Sequence' and 'Sequence[str]' in line:
-            self.__sequence_str(line, start)
-
-    def __disable_name_only(self, string, start):
-        # type: (str, typing.Tuple[int, int]) -> None
-        start_row, _ = start
+        lines_to_check, self.__lines_to_check = self.__lines_to_check, None
+        symbols = {symbol for symbol in lexical_rules.SYMBOLS if self.linter.is_message_enabled(symbol)}
+        if not symbols or lines_to_check == set():
+            return
 
         def get_name(code):
-            try:
-                return self.linter.msgs_store.get_msg_display_string(code)
-            except pylint.utils.UnknownMessageError:
-                return 'unknown'
-
-        matches = self.RE_PYLINT_DISABLE.match(string)
-        if matches:
-            for msg in matches.group('messages').split(','):
-                msg = msg.strip()
-                if self.RE_PYLINT_MESSAGE_CODE.match(msg):
-                    self.add_message('disable-name-only', line=start_row,
-                                     args={'code': msg, 'name': get_name(msg)})
-
-    def __sequence_str(self, string, start):
-        # type: (str, typing.Tuple[int, int]) -> None
-        start_row, _ = start
-        if self.RE_SEQUENCE_STRING.match(string):
-            self.add_message('sequence-of-string', line=start_row)
+            if self.__message_names is None:
+                self.__message_names = message_names(self.linter)  # Every checker has been registered by now
+            return self.__message_names.get(code, 'unknown')
+
+        for message in lexical_rules.lexical_messages(tokens, symbols, lines_to_check):
+            if message.code is None:
+                self.add_message(message.symbol, line=message.line)
+            else:
+                self.add_message(message.symbol, line=message.line,
+                                 args={'code': message.code, 'name': get_name(message.code)})
+
+
+def message_names(linter):  # type: (lint.PyLinter) -> typing.Mapping[str, str]
+    """Map the codes of the messages registered with linter, including their old codes, to how pylint displays them.
+
+    disable-name-only suggests these names instead of the codes.
+    """
+    store = linter.msgs_store
+    codes = set()  # type: typing.Set[str]
+    for definition in store.messages:
+        codes.add(definition.msgid)
+        codes.update(old_code for old_code, _ in getattr(definition, 'old_names', ()))
+    return types.MappingProxyType({code: store.get_msg_display_string(code) for code in codes})
+
+
+def default_message_names():  # type: () -> typing.Mapping[str, str]
+    """message_names for a linter loading pylint's default checkers and this package's."""
+    linter = lint.PyLinter()
+    linter.load_default_plugins()
+    linter.load_plugin_modules(['shopify_python'])
+    return message_names(linter)
+
+
+def known_messages_source(names):  # type: (typing.Mapping[str, str]) -> str
+    """The source of shopify_python.known_messages holding names."""
+    lines = [
+        '"""How pylint displays the name of each message of its own checkers and of this package\'s, by code.',
+        '',
+        'Old codes are included. lexical_rules names the codes disable-name-only finds after this table when pylint '
+        'isn\'t',
+        'installed. Generated with `make known_messages` from shopify_styleguide.default_message_names (pylint {}).'
+        .format(pylint.__version__),
+        '"""',
+        '',
+        'NAMES = {',
+    ]
+    lines.extend('    {!r}: {!r},'.format(code, name) for code, name in sorted(names.items()))
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv=None):  # type: (typing.Optional[typing.List[str]]) -> int
+    """Write the source of shopify_python.known_messages for the installed pylint to the path given."""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print('usage: python -m shopify_python.shopify_styleguide KNOWN_MESSAGES_PATH', file=sys.stderr)
+        return 2
+    with io.open(argv[0], 'w', encoding='utf-8') as source_file:
+        source_file.write(known_messages_source(default_message_names()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Node-count based Google style rules evaluated on the standard library's ast module.
+
+The try-too-long, except-too-long, finally-too-long and use-simple-lambdas rules only look at the size of syntax
+trees. Parsing with the CPython ast module is much cheaper than building astroid trees, so this module applies those
+rules to files on its own (see quick_pass):
+
+    python -m shopify_python.size_rules [path ...]
+
+Node counts are mapped to the counts shopify_python.ast.count_tree_size gives on the astroid (1.x/2.x) tree of the
+same code, so the messages and the number of nodes they report match those of GoogleStyleGuideChecker.
+"""
+
+import ast
+import collections
+import io
+import sys
+import typing  # pylint: disable=unused-import
+
+from shopify_python import quick_pass
+
+MAX_TRY_NODES = 25
+MAX_EXCEPT_NODES = 23
+MAX_FINALLY_NODES = 13
+MAX_LAMBDA_NODES = 15
+
+SizeMessage = collections.namedtuple('SizeMessage', ['symbol', 'line', 'column', 'found'])
+
+# Nodes astroid keeps as plain attributes (e.g. operators as strings), or doesn't have at all (a with statement's
+# items are tuples); they aren't counted themselves, but their children are
+_TRANSPARENT_NODES = (ast.expr_context, ast.operator, ast.boolop, ast.unaryop, ast.cmpop, ast.alias, ast.withitem)
+
+# Nodes whose leading docstring astroid moves out of the body
+_DOCUMENTED_NODES = (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+# Nodes holding a name that astroid turns into an AssignName node, and the field holding it
+_NAMED_NODES = [(ast.ExceptHandler, 'name')]  # type: typing.List[typing.Tuple[type, str]]
+if sys.version_info >= (3, 10):
+    _NAMED_NODES.extend([(ast.MatchAs, 'name'), (ast.MatchStar, 'name'), (ast.MatchMapping, 'rest')])
+
+
+def _hidden_children(node):  # type: (ast.AST) -> typing.List[ast.AST]
+    """Children of node that have no counterpart among the children of the astroid node."""
+    hidden = []
+    if isinstance(node, _DOCUMENTED_NODES) and node.body and isinstance(node.body[0], ast.Expr):
+        value = node.body[0].value
+        if isinstance(value, ast.Str if sys.version_info < (3, 8) else ast.Constant) and \
+                isinstance(getattr(value, 'value', getattr(value, 's', None)), str):
+            hidden.append(node.body[0])  # The docstring becomes an attribute of the astroid node
+    if isinstance(node, ast.ClassDef):
+        hidden.extend(keyword for keyword in node.keywords if keyword.arg == 'metaclass')
+    return hidden
+
+
+def _weight(node, parent):  # type: (ast.AST, typing.Optional[ast.AST]) -> int
+    """The number of astroid nodes standing for node itself, not counting its children."""
+    if isinstance(node, _TRANSPARENT_NODES):
+        return 0
+    if isinstance(parent, ast.arguments) and node in (parent.vararg, parent.kwarg):
+        return 0  # *args and **kwargs are names in astroid; only their annotations are nodes
+    weight = 1
+    for node_type, field in _NAMED_NODES:
+        if isinstance(node, node_type) and getattr(node, field) is not None:
+            weight += 1
+    if isinstance(node, ast.Dict):
+        weight += sum(1 for key in node.keys if key is None)  # **mapping in a dict display is a DictUnpack
+    elif isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and node.decorator_list:
+        weight += 1  # astroid wraps decorators in a Decorators node
+    elif isinstance(node, ast.Try) and node.handlers and node.finalbody:
+        weight += 1  # astroid nests a TryExcept inside a TryFinally
+    return weight
+
+
+def count_tree_size(node):  # type: (ast.AST) -> int
+    """Count the nodes of the astroid tree equivalent to the subtree of stdlib ast nodes rooted at node."""
+    size = 0
+    stack = [(node, None)]  # type: typing.List[typing.Tuple[ast.AST, typing.Optional[ast.AST]]]
+    while stack:
+        node, parent = stack.pop()
+        size += _weight(node, parent)
+        hidden = _hidden_children(node)
+        stack.extend((child, node) for child in ast.iter_child_nodes(node) if not any(child is h for h in hidden))
+    return size
+
+
+def check_tree(tree,  # type: ast.AST
+               max_try_nodes=MAX_TRY_NODES,  # type: int
+               max_except_nodes=MAX_EXCEPT_NODES,  # type: int
+               max_finally_nodes=MAX_FINALLY_NODES,  # type: int
+               max_lambda_nodes=MAX_LAMBDA_NODES,  # type: int
+               ):
+    # type: (...) -> typing.List[SizeMessage]
+    """Apply the node-count rules to a stdlib ast tree, returning messages in the order pylint would emit them."""
+    messages = []  # type: typing.List[SizeMessage]
+
+    def check(symbol, node, body, limit):  # type: (str, ast.AST, typing.Sequence[ast.AST], int) -> None
+        found = sum(count_tree_size(child) for child in body)
+        if found > limit:
+            messages.append(SizeMessage(symbol, node.lineno, node.col_offset, found))
+
+    for node in _walk(tree):
+        if isinstance(node, ast.Try):
+            if node.finalbody:
+                check('finally-too-long', node, node.finalbody, max_finally_nodes)
+            if node.handlers:
+                check('try-too-long', node, node.body, max_try_nodes)
+                for handler in node.handlers:
+                    check('except-too-long', handler, [handler], max_except_nodes)
+        elif isinstance(node, ast.Lambda):
+            check('use-simple-lambdas', node, [node], max_lambda_nodes)
+    return messages
+
+
+def check_source(source, filename='<unknown>', **limits):  # type: (typing.Union[str, bytes], str, **int) -> list
+    """Parse source and apply the node-count rules to it, see check_tree."""
+    return check_tree(ast.parse(source, filename), **limits)
+
+
+def _walk(tree):  # type: (ast.AST) -> typing.Generator[ast.AST, None, None]
+    """Yield the nodes of tree in pre-order, the order pylint visits them."""
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(ast.iter_child_nodes(node))))
+
+
+def check_file(path):  # type: (str) -> list
+    """Apply the rules to a file, see check_tree."""
+    with io.open(path, 'rb') as source_file:
+        return check_source(source_file.read(), path)
+
+
+def main(argv=None):  # type: (typing.Optional[typing.List[str]]) -> int
+    return quick_pass.main(check_file, lambda path, message: '{}:{}:{}: {} ({} nodes)'.format(
+        path, message.line, message.column, message.symbol, message.found), argv)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,8 @@
+import collections
+import sys
+
 import astroid
+import pytest
 
 from shopify_python import ast
 
@@ -9,3 +13,72 @@ def test_count_tree_size():
         return x * y if x > 5 else 0
     """)
     assert ast.count_tree_size(root) == 14
+
+
+def test_count_tree_size_with_limit():
+    root = astroid.builder.parse("""
+    def test(x, y):
+        return x * y if x > 5 else 0
+    """)
+    assert ast.count_tree_size(root, limit=14) == 14
+    assert ast.count_tree_size(root, limit=20) == 14
+    assert ast.count_tree_size(root, limit=5) == 6
+    assert ast.count_tree_size(root, limit=0) == 1
+
+
+def test_count_tree_size_deeply_nested():
+    root = astroid.nodes.Const(1)
+    for _ in range(sys.getrecursionlimit() * 2):
+        operand, root = root, astroid.nodes.UnaryOp('-')
+        root.postinit(operand)
+    assert ast.count_tree_size(root) == sys.getrecursionlimit() * 2 + 1
+    assert ast.count_tree_size(root, limit=10) == 11
+
+
+def test_module_index():
+    root = astroid.builder.parse("""
+    def test(x, y):
+        try:
+            return x * y if x > 5 else 0
+        except ValueError:
+            return 0
+    """)
+    index = ast.ModuleIndex(root)
+    assert index.root is root
+    assert len(index) == ast.count_tree_size(root)
+    for node in root.nodes_of_class(astroid.NodeNG):
+        assert node in index
+        assert index.size(node) == ast.count_tree_size(node)
+    assert astroid.builder.parse('x = 1') not in index
+
+    assert index.position(root.body[0]) == 1
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_flat_tree(use_numpy, monkeypatch):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(ast, '_numpy', lambda: None)
+    root = astroid.builder.parse("""
+    def test(x, y):
+        return x * y if x > 5 else 0
+
+    class Test(object):
+        async def method(self):
+            return lambda: 1
+    """)
+    tree = ast.FlatTree(root)
+    nodes = list(root.nodes_of_class(astroid.NodeNG))
+    assert len(tree) == len(nodes)
+    for position, node in enumerate(nodes):
+        assert ast.type_name(tree.type_codes[position]) == type(node).__name__
+        assert tree.parents[position] == (nodes.index(node.parent) if position else -1)
+        assert [nodes[child] for child in tree.children(position)] == list(node.get_children())
+        assert tree.sizes[position] == ast.count_tree_size(node)
+        assert (tree.first_lines[position], tree.columns[position]) == (node.lineno or 0, node.col_offset or 0)
+
+    depths = collections.Counter(len(list(node.node_ancestors())) for node in nodes)
+    assert tree.depth_histogram() == [depths[depth] for depth in range(len(depths))]
+    functions = [root.body[0], root.body[1].body[0]]
+    assert tree.function_sizes() == {nodes.index(node): ast.count_tree_size(node) for node in functions}
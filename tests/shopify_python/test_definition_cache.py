@@ -0,0 +1,52 @@
+import typing  # pylint: disable=unused-import
+
+import py  # pylint: disable=unused-import
+
+from shopify_python import definition_cache
+
+
+def _messages(symbol):  # type: (str) -> typing.List[definition_cache.DefinitionMessage]
+    return [definition_cache.DefinitionMessage(symbol, 1, 4, 'Lambda', [])]
+
+
+def test_round_trip(tmpdir):
+    # type: ('py.path.LocalPath') -> None
+    cache = definition_cache.DefinitionCache(str(tmpdir))
+    assert cache.get('key') is None
+    cache.set('key', _messages('use-simple-lambdas'))
+    cache.save()
+
+    reloaded = definition_cache.DefinitionCache(str(tmpdir))
+    assert reloaded.get('key') == _messages('use-simple-lambdas')
+    assert (reloaded.hits, reloaded.misses) == (1, 0)
+
+
+def test_concurrent_saves_keep_each_others_entries(tmpdir):
+    # type: ('py.path.LocalPath') -> None
+    first = definition_cache.DefinitionCache(str(tmpdir))
+    second = definition_cache.DefinitionCache(str(tmpdir))
+    first.set('first', _messages('try-too-long'))
+    second.set('second', _messages('finally-too-long'))
+    first.save()
+    second.save()
+
+    reloaded = definition_cache.DefinitionCache(str(tmpdir))
+    assert reloaded.get('first') == _messages('try-too-long')
+    assert reloaded.get('second') == _messages('finally-too-long')
+
+
+def test_save_drops_least_recently_used_entries(tmpdir):
+    # type: ('py.path.LocalPath') -> None
+    cache = definition_cache.DefinitionCache(str(tmpdir))
+    for key in ('old', 'used', 'new'):
+        cache.set(key, [])
+    cache.save()
+
+    other = definition_cache.DefinitionCache(str(tmpdir), max_entries=2)
+    assert other.get('used') == []
+    other.set('newest', [])
+    other.save()
+
+    reloaded = definition_cache.DefinitionCache(str(tmpdir))
+    assert len(reloaded) == 2
+    assert reloaded.get('used') == [] and reloaded.get('newest') == []
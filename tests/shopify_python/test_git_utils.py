@@ -1,8 +1,14 @@
+import io
 import os
+import sys
+import threading
+import typing  # pylint: disable=unused-import
 import py  # pylint: disable=unused-import
 import pytest
+import astroid
 import git  # pylint: disable=unused-import
 from git import repo
+from pylint import interfaces
 from shopify_python import git_utils
 
 
@@ -327,3 +333,383 @@ def test_passing_linter(tmpdir):
 
     lint_results = [x for x in git_utils.pylint_files([str(tmpdir)], reports='n')]
     assert lint_results == []
+
+
+def test_imports_to_prefetch(tmpdir):
+    # type: ('py.path.LocalPath') -> None
+    tmpdir.join('first.py').write("from xml import dom\nfrom os import environ, path\nfrom . import sibling\n")
+    tmpdir.mkdir('package').join('second.py').write("from xml import dom\nfrom collections import abc\n")
+    tmpdir.join('invalid.py').write("from xml import (\n")
+
+    assert git_utils._imports_to_prefetch([str(tmpdir)]) == {  # pylint: disable=protected-access
+        'xml.dom', 'os.environ', 'os.path', 'collections.abc'}
+
+
+@pytest.mark.parametrize('import_resolver', ['astroid', 'spec'])
+def test_prefetch_imports_keeps_messages(tmpdir, import_resolver):
+    # type: ('py.path.LocalPath', str) -> None
+    package = tmpdir.mkdir('stubbed')
+    package.join('__init__.py').write('')
+    package.join('stub.pyi').write('')
+    tmpdir.join('user.py').write('"""Imports a module only stubbed."""\nfrom stubbed import stub\n\nprint(stub)\n')
+    files = [str(tmpdir.join('user.py'))]
+    options = {'load-plugins': 'shopify_python', 'import-resolver': import_resolver}
+
+    expected = [message.msg_id for message in git_utils.pylint_files(files, **options)]
+    assert ('C6001' in expected) == (import_resolver == 'astroid')  # import-modules-only
+    assert [message.msg_id for message in git_utils.pylint_files(files, prefetch_imports=True, **options)] == expected
+
+
+def test_include_renamed_files(main_repo, python_file):
+    # type: (repo.Repo, str) -> None
+
+    origin = main_repo.remote('origin')
+    main_repo.index.add([python_file])
+    main_repo.index.commit("adding python file")
+    origin.push()
+
+    main_repo.create_head('foo').checkout()
+    main_repo.index.move([python_file, os.path.join(main_repo.working_dir, 'renamed.py')])
+    main_repo.index.commit("renaming python file")
+    assert git_utils.changed_python_files_in_tree(main_repo.working_dir) == ['renamed.py']
+
+
+def test_changed_files_are_streamed(main_repo, python_file, python_script):
+    # type: (repo.Repo, str, str) -> None
+
+    main_repo.create_head('foo').checkout()
+    main_repo.index.add([python_file, python_script])
+    main_repo.index.commit("adding python files")
+
+    changed_files = git_utils.iter_changed_python_files_in_tree(main_repo.working_dir)
+    assert not isinstance(changed_files, list)
+    assert sorted(changed_files) == [os.path.basename(python_script), os.path.basename(python_file)]
+
+
+def test_changed_files_are_classified_in_chunks(main_repo, python_file, python_script, non_python_file, monkeypatch):
+    # type: (repo.Repo, str, str, str, typing.Any) -> None
+
+    main_repo.create_head('foo').checkout()
+    main_repo.index.add([python_file, python_script, non_python_file])
+    main_repo.index.commit("adding mixed files")
+
+    chunks = []
+    original_python_files = git_utils._python_files  # pylint: disable=protected-access
+
+    def python_files(paths, jobs):
+        chunks.append((len(paths), jobs))
+        return original_python_files(paths, jobs)
+
+    monkeypatch.setattr(git_utils, '_python_files', python_files)
+    monkeypatch.setattr(git_utils, '_CLASSIFICATION_CHUNK_SIZE', 2)
+    changed_files = git_utils.changed_python_files_in_tree(main_repo.working_dir, jobs=3)
+    assert sorted(changed_files) == sorted([os.path.basename(python_script), os.path.basename(python_file)])
+    assert chunks == [(2, 3), (1, 3)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 100])
+def test_nul_separated(chunk_size):
+    # type: (int) -> None
+    stream = io.BytesIO(b'M\0a.py\0R100\0old.py\0new \xc3\xa9.py\0')
+    assert list(git_utils._nul_separated(stream, chunk_size)) == [  # pylint: disable=protected-access
+        b'M', b'a.py', b'R100', b'old.py', b'new \xc3\xa9.py']
+
+
+def test_git_session(main_repo, python_file, python_script, non_python_file, monkeypatch):
+    # type: (repo.Repo, str, str, str, typing.Any) -> None
+
+    main_repo.create_head('foo').checkout()
+    main_repo.index.add([python_file, non_python_file])
+    main_repo.index.commit("adding mixed files")
+
+    session = git_utils.GitSession(main_repo.working_dir)
+    assert session.changed_python_files() == [os.path.basename(python_file)]
+    merge_base_sha = session.merge_base_sha
+    assert merge_base_sha == main_repo.remote('origin').refs.master.commit.hexsha
+
+    classified = []
+    original_file_is_python = git_utils._file_is_python  # pylint: disable=protected-access
+    monkeypatch.setattr(git_utils, '_file_is_python', lambda path: classified.append(path) or
+                        original_file_is_python(path))
+    monkeypatch.setattr(git_utils, '_remote_origin_master', None)
+    monkeypatch.setattr(session.repo, 'merge_base', None)
+    assert session.changed_python_files() == [os.path.basename(python_file)]
+    assert not classified
+
+    # Moving HEAD invalidates what the session knows
+    monkeypatch.undo()
+    main_repo.index.add([python_script])
+    main_repo.index.commit("adding python script")
+    assert sorted(session.changed_python_files()) == sorted([os.path.basename(python_file),
+                                                             os.path.basename(python_script)])
+    assert session.merge_base_sha == merge_base_sha
+
+
+def test_python_files_are_classified_once(tmpdir, monkeypatch):
+    # type: ('py.path.LocalPath', typing.Any) -> None
+    tmpdir.join('module.py').write('')
+    tmpdir.join('script').write('#!/usr/bin/env python\n' + 'x = 1\n' * 10000)
+    tmpdir.join('binary').write_binary(b'\x7fELF\xff\xfe\x00python')
+    tmpdir.join('shell').write('#!/bin/sh\n# python\n')
+    tmpdir.join('data.csv').write('#!python\n')
+    tmpdir.mkdir('directory')
+    paths = [str(tmpdir.join(name)) for name in ['module.py', 'script', 'shell', 'binary', 'data.csv', 'directory',
+                                                 'missing']]
+    threads = threading.active_count()
+    assert git_utils._python_files(paths, jobs=2) == paths[:2]  # pylint: disable=protected-access
+    assert threading.active_count() == threads  # None left running when workers are forked
+
+    classified = []
+    original_file_is_python = git_utils._file_is_python  # pylint: disable=protected-access
+    monkeypatch.setattr(git_utils, '_file_is_python', lambda path: classified.append(path) or
+                        original_file_is_python(path))
+    assert git_utils._python_files(paths) == paths[:2]  # pylint: disable=protected-access
+    assert not classified
+
+    tmpdir.join('shell').write('#!/usr/bin/python3\n')
+    os.utime(str(tmpdir.join('shell')), (0, 0))
+    assert git_utils._python_files(paths) == paths[:3]  # pylint: disable=protected-access
+    assert classified == [str(tmpdir.join('shell'))]
+
+
+def test_changed_files_against_base_ref(main_repo, python_file, python_script):
+    # type: (repo.Repo, str, str) -> None
+
+    main_repo.create_head('release')
+    main_repo.git.checkout('-b', 'feature')
+    main_repo.index.add([python_file])
+    main_repo.index.commit("adding python file")
+    first_commit = main_repo.head.commit.hexsha
+    main_repo.index.add([python_script])
+    main_repo.index.commit("adding python script")
+    main_repo.delete_remote('origin')
+
+    program, script = os.path.basename(python_file), os.path.basename(python_script)
+    assert sorted(git_utils.changed_python_files_in_tree(main_repo.working_dir, base='release')) == [script, program]
+    assert git_utils.changed_python_files_in_tree(main_repo.working_dir, base=first_commit) == [script]
+    assert git_utils.changed_python_files_in_tree(
+        main_repo.working_dir, base='release..{}'.format(first_commit), mode=git_utils.RANGE) == [program]
+    session = git_utils.GitSession(main_repo.working_dir, base='release')
+    assert sorted(session.changed_python_files()) == [script, program]
+
+
+def test_range_from_a_commit_ends_at_head(main_repo, python_file, python_script):
+    # type: (repo.Repo, str, str) -> None
+
+    main_repo.index.add([python_file])
+    main_repo.index.commit("adding python file")
+    first_commit = main_repo.head.commit.hexsha
+    main_repo.index.add([python_script])
+    main_repo.index.commit("adding python script")
+    with open(python_file, 'a') as appending_file:
+        appending_file.write('\n# Uncommitted change\n')
+
+    assert git_utils.changed_python_files_in_tree(main_repo.working_dir, base=first_commit, mode=git_utils.RANGE) == \
+        [os.path.basename(python_script)]
+
+
+@pytest.mark.parametrize('mode', [git_utils.BRANCH, git_utils.RANGE])
+def test_base_cant_be_an_option(main_repo, mode):
+    # type: (repo.Repo, str) -> None
+    with pytest.raises(ValueError):
+        git_utils.changed_python_files_in_tree(main_repo.working_dir, base='--output=/tmp/diff', mode=mode)
+    with pytest.raises(ValueError):
+        git_utils.GitSession(main_repo.working_dir, base='--all')
+
+
+def test_staged_and_unstaged_changes(main_repo, python_file, python_script):
+    # type: (repo.Repo, str, str) -> None
+
+    main_repo.index.add([python_file, python_script])
+    main_repo.index.commit("adding python files")
+    with open(python_file, 'a') as appending_file:
+        appending_file.write('\n# Unstaged change\n')
+    with open(python_script, 'a') as appending_file:
+        appending_file.write('\n# Staged change\n')
+    main_repo.index.add([python_script])
+
+    staged = git_utils.changed_python_files_in_tree(main_repo.working_dir, mode=git_utils.STAGED)
+    assert staged == [os.path.basename(python_script)]
+    unstaged = git_utils.changed_python_files_in_tree(main_repo.working_dir, mode=git_utils.UNSTAGED)
+    assert unstaged == [os.path.basename(python_file)]
+
+
+def test_invalid_modes(main_repo):
+    # type: (repo.Repo) -> None
+    with pytest.raises(ValueError):
+        git_utils.changed_python_files_in_tree(main_repo.working_dir, mode='everything')
+    with pytest.raises(ValueError):
+        git_utils.changed_python_files_in_tree(main_repo.working_dir, mode=git_utils.RANGE)
+
+
+def test_parallel_linter_matches_single_process(tmpdir):
+    # type: ('py.path.LocalPath') -> None
+    open(str(tmpdir.join('__init__.py')), 'w')
+    python_files = []
+    for index in range(5):
+        path = tmpdir.join('file{}.py'.format(index))
+        path.write('def my_function():    \n' + '  return {}\n'.format(index) * (index * 5 + 1) + 'import os\n')
+        python_files.append(str(path))
+
+    single_process = list(git_utils.pylint_files(python_files, disable='missing-docstring'))
+    assert len(single_process) > len(python_files)
+    assert list(git_utils.pylint_files(python_files, jobs=3, disable='missing-docstring')) == single_process
+
+
+def test_parallel_linter_keeps_syntax_errors(tmpdir, monkeypatch):
+    # type: ('py.path.LocalPath', typing.Any) -> None
+    monkeypatch.chdir(tmpdir)
+    tmpdir.join('broken.py').write('def broken(:\n')
+    package = tmpdir.mkdir('package')
+    package.join('__init__.py').write('')
+    package.join('broken.py').write('def broken(:\n')
+    package.join('fine.py').write('import os\n')
+    files = ['broken.py', 'package'] + ['file{}.py'.format(index) for index in range(3)]
+    for path in files[2:]:
+        tmpdir.join(path).write('import os\n')
+
+    single_process = list(git_utils.pylint_files(files, disable='missing-docstring'))
+    assert [message.msg_id for message in single_process].count('E0001') == 2
+    assert list(git_utils.pylint_files(files, jobs=3, disable='missing-docstring')) == single_process
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Only workers forked on Linux have the parent trees')
+def test_parallel_workers_start_with_preloaded_modules(tmpdir, monkeypatch):
+    # type: ('py.path.LocalPath', typing.Any) -> None
+    installed = tmpdir.mkdir('installed')
+    installed.join('preloaded.py').write('"""Preloaded."""\nVALUE = 1\n')
+    monkeypatch.syspath_prepend(str(installed))
+    python_files = []
+    for index in range(2):
+        path = tmpdir.join('importer{}.py'.format(index))
+        path.write('"""Importer."""\nimport preloaded\nprint(preloaded.VALUE, preloaded.MISSING)\n')
+        python_files.append(str(path))
+
+    try:
+        assert git_utils.preload(['preloaded', 'not_installed']) == ['not_installed']
+        installed.join('preloaded.py').remove()  # Only known from the tree built before forking now
+        messages = git_utils.pylint_files(python_files, jobs=2)
+    finally:
+        astroid.MANAGER.astroid_cache.pop('preloaded', None)
+    assert [(message.module, message.msg_id) for message in messages if message.module.startswith('importer')] == [
+        ('importer0', 'E1101'), ('importer1', 'E1101')]
+
+
+def test_parallel_workers_only_preload_where_forked(tmpdir, monkeypatch):
+    # type: ('py.path.LocalPath', typing.Any) -> None
+    python_files = []
+    for index in range(2):
+        path = tmpdir.join('module{}.py'.format(index))
+        path.write('import os\n')
+        python_files.append(str(path))
+    expected = list(git_utils.pylint_files(python_files))
+
+    preloaded = []
+    monkeypatch.setattr(git_utils, '_FORKS_WORKERS', False)
+    monkeypatch.setattr(git_utils, 'preload', preloaded.append)
+    assert list(git_utils.pylint_files(python_files, jobs=2, preload_modules=['os'])) == expected
+    assert not preloaded
+
+
+def test_shards_are_balanced_by_size(tmpdir):
+    # type: ('py.path.LocalPath') -> None
+    sizes = [10, 70, 20, 40, 30, 50]
+    paths = []
+    for index, size in enumerate(sizes):
+        tmpdir.join('file{}.py'.format(index)).write('#' * size)
+        paths.append(str(tmpdir.join('file{}.py'.format(index))))
+    shards = git_utils._shards(paths, 3)  # pylint: disable=protected-access
+    assert shards == [[0, 1], [2, 5], [3, 4]]
+    assert [sum(sizes[index] for index in shard) for shard in shards] == [80, 70, 70]
+
+
+def test_lint_cache_returns_stored_messages(tmpdir, monkeypatch):
+    # type: ('py.path.LocalPath', typing.Any) -> None
+    source = tmpdir.mkdir('source')
+    python_files = []
+    for index in range(3):
+        path = source.join('file{}.py'.format(index))
+        path.write('import os\n' * (index + 1))
+        python_files.append(str(path))
+    cache = git_utils.LintCache(str(tmpdir.join('cache')))
+
+    uncached = list(git_utils.pylint_files(python_files, cache=cache))
+    assert (cache.hits, cache.misses, len(cache)) == (0, 3, 4)  # The first file and the run itself were linted
+    assert list(git_utils.pylint_files(python_files)) == uncached
+
+    linted = []
+    run_pylint = git_utils.run_pylint
+
+    def record_run(files, *args):
+        linted.extend(files)
+        return run_pylint(files, *args)
+
+    monkeypatch.setattr(git_utils, 'run_pylint', record_run)
+    source.join('file1.py').write('import sys\n')
+    cached = list(git_utils.pylint_files(python_files, cache=cache))
+    assert linted == [python_files[1]]
+    assert (cache.hits, cache.misses, len(cache)) == (3, 4, 5)
+    assert cached == list(git_utils.pylint_files(python_files))
+
+    del linted[:]
+    assert list(git_utils.pylint_files(python_files, cache=cache, disable='unused-import')) == [
+        message for message in cached if message.msg_id != 'W0611']
+    assert linted == python_files
+
+
+def test_lint_cache_relocates_copies_to_their_module(tmpdir, monkeypatch):
+    # type: ('py.path.LocalPath', typing.Any) -> None
+    monkeypatch.chdir(str(tmpdir))
+    package = tmpdir.mkdir('package')
+    package.join('__init__.py').write('')
+    original, copy = tmpdir.join('original.py'), package.join('copy.py')
+    for path in (original, copy):
+        path.write('import os\n')
+    cache = git_utils.LintCache(str(tmpdir.join('cache')))
+
+    list(git_utils.pylint_files([str(original)], cache=cache))
+    cached = list(git_utils.pylint_files([str(copy)], cache=cache))
+    assert cache.hits == 2
+    assert cached == list(git_utils.pylint_files([str(copy)]))
+    assert {message.module for message in cached} == {'package.copy'}
+
+
+def test_lint_cache_replays_messages_about_the_run(tmpdir, monkeypatch):
+    # type: ('py.path.LocalPath', typing.Any) -> None
+    monkeypatch.chdir(str(tmpdir))
+    tmpdir.join('pylintrc').write('[MESSAGES CONTROL]\nunknown-option=yes\n')
+    tmpdir.join('module.py').write('import os\n')
+    cache = git_utils.LintCache(str(tmpdir.join('cache')))
+    uncached = list(git_utils.pylint_files(['module.py']))
+    assert 'E0015' in [message.msg_id for message in uncached]  # unrecognized-option
+
+    assert list(git_utils.pylint_files(['module.py'], cache=cache)) == uncached
+    monkeypatch.setattr(git_utils, 'run_pylint', None)
+    assert list(git_utils.pylint_files(['module.py'], cache=cache)) == uncached
+    assert cache.hits == 2
+
+
+def test_lint_cache_key_includes_python_version(tmpdir, monkeypatch):
+    # type: ('py.path.LocalPath', typing.Any) -> None
+    path = tmpdir.join('file.py')
+    path.write('print(1)\n')
+    cache = git_utils.LintCache(str(tmpdir.join('cache')))
+    key = cache.key(str(path), '')
+    monkeypatch.setattr(git_utils, '_PYTHON_VERSION', 'cpython 2.7.18.final.0')
+    assert cache.key(str(path), '') != key
+
+
+def test_lint_cache_evicts_least_recently_used(tmpdir):
+    # type: ('py.path.LocalPath') -> None
+    cache = git_utils.LintCache(str(tmpdir), max_size=200)
+    record = ('C0000', 'symbol', ('', '', '', '', 1, 0, None, None), 'x' * 20, interfaces.HIGH)
+    for index, key in enumerate(['old', 'used', 'new']):
+        cache.set(key, [record])
+        os.utime(str(tmpdir.join(key + '.json')), (index, index))
+    assert cache.get('used') == [record]
+
+    cache.evict()
+    assert cache.get('old') is None
+    assert cache.get('used') == [record]
+    assert cache.get('new') == [record]
+    assert (cache.hits, cache.misses, cache.evictions) == (3, 1, 1)
@@ -1,11 +1,20 @@
 import contextlib
+import json
+import os
+import re
+import subprocess
 import sys
 
 import astroid
+import pylint.checkers.base
+import pylint.lint
 import pylint.testutils
+import pylint.utils
 import pytest
 
+import shopify_python.ast
 from shopify_python import google_styleguide
+from shopify_python import import_resolution
 
 
 class TestGoogleStyleGuideChecker(pylint.testutils.CheckerTestCase):  # pylint: disable=too-many-public-methods
@@ -91,6 +100,34 @@ class TestGoogleStyleGuideChecker(pylint.testutils.CheckerTestCase):  # pylint:
         ):
             self.walk(root)
 
+    def test_global_variables_follow_naming_configuration(self, monkeypatch):
+        name_checkers = []
+
+        class NameChecker(pylint.checkers.base.NameChecker):
+
+            def __init__(self, linter):
+                super(NameChecker, self).__init__(linter)
+                name_checkers.append(self)
+
+        monkeypatch.setattr(pylint.checkers.base, 'NameChecker', NameChecker)
+        self.setup_method()
+        assert not name_checkers  # Naming regexps are only built when needed
+
+        NameChecker(self.linter)  # Registers the naming options
+        self.linter.config.const_rgx = re.compile('^[a-z_]+$')
+        root = astroid.builder.parse("""
+        module_var = 1
+        OTHER_CONSTANT = 10
+        """)
+        self.walk(root)
+        assert [message.args['name'] for message in self.linter.release_messages()] == ['OTHER_CONSTANT']
+        self.setup_method()
+        NameChecker(self.linter)
+        name_checkers_built = len(name_checkers)
+        self.linter.config.const_rgx = re.compile('^[a-z_]+$')
+        self.walk(root)
+        assert len(name_checkers) == name_checkers_built
+
     @pytest.mark.skipif(sys.version_info >= (3, 0), reason="Tests code that is Python 3 incompatible")
     def test_using_archaic_raise_fails(self):
         root = astroid.builder.parse("""
@@ -378,3 +415,180 @@ class TestGoogleStyleGuideChecker(pylint.testutils.CheckerTestCase):  # pylint:
                 def apply():
                     pass
             """))
+
+    def test_import_resolution_cache(self, tmpdir, monkeypatch):
+        root = astroid.builder.parse("""
+        from xml import dom
+        from os import environ
+        """)
+        self.checker.linter.config.import_cache_dir = str(tmpdir)
+        self.checker.open()
+        self.walk(root)
+        self.checker.close()
+        messages = [(message.msg_id, message.args) for message in self.linter.release_messages()]
+        assert messages == [('import-modules-only', {'child': 'os.environ'})]
+
+        def import_module(*_):
+            raise AssertionError('Resolved through astroid instead of the cache')
+
+        monkeypatch.setattr(astroid.Module, 'import_module', import_module)
+        self.checker.open()
+        self.walk(root)
+        assert [(message.msg_id, message.args) for message in self.linter.release_messages()] == messages
+
+    def test_import_resolutions_shared_across_modules(self):
+        for _ in range(3):
+            self.walk(astroid.builder.parse("""
+            from xml import dom
+            from os import environ
+            """))
+        assert (self.checker.import_resolver.hits, self.checker.import_resolver.misses) == (4, 2)
+        assert len(self.linter.release_messages()) == 3
+
+    def test_importing_with_module_index(self, tmpdir, monkeypatch):
+        package = tmpdir.mkdir('indexed_package')
+        package.join('__init__.py').write('')
+        package.join('module.py').write('')
+        monkeypatch.syspath_prepend(str(tmpdir))
+        monkeypatch.setattr(import_resolution, 'indexed_directories', lambda: [str(tmpdir)])
+        monkeypatch.setattr(astroid.Module, 'import_module', None)
+        self.checker.linter.config.import_module_index = str(tmpdir.join('index'))
+        self.checker.open()
+        self.walk(astroid.builder.parse("""
+        from indexed_package import module
+        from indexed_package import function
+        """))
+        self.checker.close()
+        assert [message.args['child'] for message in self.linter.release_messages()] == ['indexed_package.function']
+
+    def test_disabled_import_modules_only_resolves_nothing(self, monkeypatch):
+        def is_module(*_):
+            raise AssertionError('Resolved an import while import-modules-only is disabled')
+
+        monkeypatch.setattr(self.checker.import_resolver, 'is_module', is_module)
+        monkeypatch.setattr(self.linter, 'is_message_enabled', lambda message, *_: message != 'import-modules-only')
+        self.walk(astroid.builder.parse("""
+        from os import environ, path
+        """))
+        assert [message.msg_id for message in self.linter.release_messages()] == ['multiple-import-items']
+
+    def test_disabled_messages_skip_visitors(self, monkeypatch):
+        def size(*_):
+            raise AssertionError('Measured a subtree while the size checks are disabled')
+
+        monkeypatch.setattr(shopify_python.ast, 'count_tree_size', size)
+        monkeypatch.setattr(self.linter, 'is_message_enabled', lambda message, *_: message not in (
+            'try-too-long', 'except-too-long', 'finally-too-long', 'use-simple-lambdas', 'lambda-func'))
+        walker = pylint.utils.ASTWalker(self.linter)  # Unlike self.walk, asks self.linter which messages are enabled
+        walker.add_checker(self.checker)
+        walker.walk(astroid.builder.parse("""
+        try:
+            pass
+        except ValueError:
+            pass
+        finally:
+            pass
+        square = lambda x: x * x
+        """))
+        assert [message.msg_id for message in self.linter.release_messages()] == ['global-variable']
+
+    def test_importing_with_spec_resolver(self):
+        self.checker.linter.config.import_resolver = 'spec'
+        self.checker.open()
+        self.walk(astroid.builder.parse("""
+        from xml import dom
+        from os import environ
+        from os import path
+        from nonexistent_package import nonexistent_module
+        """))
+        assert [message.args['child'] for message in self.linter.release_messages()] == [
+            'os.environ', 'nonexistent_package.nonexistent_module']
+
+    def test_definition_cache(self, tmpdir):
+        source = """
+        def first():
+            return lambda x, y: x * y
+        class Second(object):
+            def method(self):
+                try:
+                    pass
+                except StandardError:
+                    pass
+        """
+        changed_source = """
+        def added(values):
+            return [value for value in values for _ in range(2)]
+
+
+        def first():
+            return lambda x, y: x * y
+        class Second(object):
+            def method(self):
+                try:
+                    pass
+                except StandardError:
+                    pass
+        """
+
+        def messages(source, definition_cache_dir):
+            self.checker.linter.config.definition_cache_dir = definition_cache_dir
+            self.checker.open()
+            self.walk(astroid.builder.parse(source))
+            self.checker.close()
+            return [(message.msg_id, message.line, message.node.as_string(), message.args)
+                    for message in self.linter.release_messages()]
+
+        assert messages(source, str(tmpdir)) == messages(source, '')
+        assert [symbol for symbol, _, _, _ in messages(source, '')] == [
+            'lambda-func', 'blank-line-after-class-required', 'catch-standard-error']
+
+        cached = messages(changed_source, str(tmpdir))
+        assert (self.checker.definition_cache.hits, self.checker.definition_cache.misses) == (2, 1)
+        assert cached == messages(changed_source, '')
+        assert [(symbol, line) for symbol, line, _, _ in cached] == [
+            ('complex-list-comp', 3), ('lambda-func', 7), ('blank-line-after-class-required', 8),
+            ('catch-standard-error', 12)]
+
+        cache_path = tmpdir.join('definitions.json')
+        os.utime(str(cache_path), (0, 0))
+        assert messages(changed_source, str(tmpdir)) == cached
+        assert (self.checker.definition_cache.hits, self.checker.definition_cache.misses) == (3, 0)
+        assert cache_path.mtime() == 0  # Only read
+
+        # Entries whose nodes can't be found, e.g. stored by another version of astroid, are checked afresh
+        entries = json.loads(cache_path.read())
+        for _, definition_messages in entries:
+            for message in definition_messages:
+                message[2] += 1
+        cache_path.write(json.dumps(entries))
+        assert messages(changed_source, str(tmpdir)) == cached
+
+
+def test_suppressed_imports_are_not_resolved(tmpdir, monkeypatch):
+    resolved = []
+    monkeypatch.setattr(import_resolution.ImportResolver, 'is_module',
+                        lambda _, importer, name: resolved.append(name) or True)
+    source = tmpdir.join('suppressed.py')
+    source.write('from os import path\n'
+                 'from os import environ  # pylint: disable=import-modules-only\n'
+                 'def function():\n'
+                 '    # pylint: disable=import-modules-only\n'
+                 '    from xml import dom\n'
+                 'from xml import sax\n')
+    pylint.lint.Run([str(source), '--load-plugins=shopify_python', '--disable=all', '--enable=import-modules-only'],
+                    exit=False)
+    assert resolved == ['os.path', 'xml.sax']
+
+
+def test_oversized_subtrees_dont_load_numpy(tmpdir):
+    source = tmpdir.join('oversized.py')
+    source.write('scale = lambda x, y: (x * 2 + y) if x % 2 == 0 else (y * 3 + x)\n')
+    output = subprocess.check_output([sys.executable, '-c', '\n'.join([
+        'import sys',
+        'from pylint import lint',
+        'lint.Run(sys.argv[1:], exit=False)',
+        'print("numpy" in sys.modules)',
+    ]), str(source), '--load-plugins=shopify_python', '--disable=all', '--enable=use-simple-lambdas'])
+    lines = output.decode('utf-8').splitlines()
+    assert any('use-simple-lambdas' in line for line in lines)
+    assert lines[-1] == 'False'
@@ -0,0 +1,302 @@
+import importlib.machinery
+import os
+import sys
+
+import astroid
+import pytest
+
+from shopify_python import import_resolution
+
+
+def test_environment_fingerprint():
+    assert import_resolution.environment_fingerprint() == import_resolution.environment_fingerprint(sys.path)
+    assert import_resolution.environment_fingerprint() != import_resolution.environment_fingerprint(sys.path[1:])
+
+
+def test_environment_fingerprint_follows_distributions(tmpdir):
+    paths = [str(tmpdir)]
+    empty = import_resolution.environment_fingerprint(paths)
+    tmpdir.mkdir('example')
+    assert import_resolution.environment_fingerprint(paths) == empty
+
+    tmpdir.mkdir('example-1.0.dist-info')
+    installed = import_resolution.environment_fingerprint(paths)
+    assert installed != empty
+
+    tmpdir.join('example-1.0.dist-info').remove()
+    tmpdir.mkdir('example-1.1.dist-info')
+    assert import_resolution.environment_fingerprint(paths) not in (empty, installed)
+
+
+def test_resolution_cache_round_trip(tmpdir):
+    cache = import_resolution.ResolutionCache(str(tmpdir.join('cache')))
+    assert cache.get('xml.dom') is None
+    cache.set('xml.dom', True)
+    cache.set('os.environ', False)
+    assert cache.get('xml.dom') is True
+    assert cache.get('os.environ') is False
+    cache.save()
+
+    assert os.path.basename(cache.path) == import_resolution.environment_fingerprint() + '.json'
+    reloaded = import_resolution.ResolutionCache(str(tmpdir.join('cache')))
+    assert len(reloaded) == 2
+    assert reloaded.get('xml.dom') is True
+    assert reloaded.get('os.environ') is False
+
+
+def test_resolution_cache_merges_concurrent_saves(tmpdir):
+    first = import_resolution.ResolutionCache(str(tmpdir))
+    second = import_resolution.ResolutionCache(str(tmpdir))
+    first.set('xml.dom', True)
+    second.set('os.environ', False)
+    first.save()
+    second.save()
+
+    reloaded = import_resolution.ResolutionCache(str(tmpdir))
+    assert (reloaded.get('xml.dom'), reloaded.get('os.environ')) == (True, False)
+
+
+def test_resolution_cache_skips_modules_outside_installation(tmpdir, monkeypatch):
+    tmpdir.join('local_package').mkdir().join('__init__.py').write('')
+    monkeypatch.syspath_prepend(str(tmpdir))
+
+    cache = import_resolution.ResolutionCache(str(tmpdir.join('cache')))
+    cache.set('local_package.module', True)
+    cache.set('missing_package.module', False)
+    cache.set('sys.path', False)
+    assert cache.get('local_package.module') is None
+    assert cache.get('missing_package.module') is None
+    assert cache.get('sys.path') is False
+
+
+def test_resolution_cache_invalidated_by_environment(tmpdir, monkeypatch):
+    cache = import_resolution.ResolutionCache(str(tmpdir))
+    cache.set('xml.dom', True)
+    cache.save()
+
+    monkeypatch.syspath_prepend(str(tmpdir.join('new_entry')))
+    assert len(import_resolution.ResolutionCache(str(tmpdir))) == 0
+
+
+def test_resolution_cache_ignores_unreadable_file(tmpdir):
+    tmpdir.join(import_resolution.environment_fingerprint() + '.json').write('{not json')
+    assert len(import_resolution.ResolutionCache(str(tmpdir))) == 0
+
+
+def test_import_resolver_remembers_results(monkeypatch):
+    importer = astroid.builder.parse('')
+    resolver = import_resolution.ImportResolver()
+    assert resolver.is_module(importer, 'xml.dom')
+    assert not resolver.is_module(importer, 'os.environ')
+    assert (resolver.hits, resolver.misses) == (0, 2)
+
+    def import_module(*_):
+        raise AssertionError('Resolved through astroid again')
+
+    monkeypatch.setattr(astroid.Module, 'import_module', import_module)
+    assert resolver.is_module(importer, 'xml.dom')
+    assert not resolver.is_module(importer, 'os.environ')
+    assert (resolver.hits, resolver.misses) == (2, 2)
+
+
+def test_import_resolver_uses_cache(tmpdir):
+    importer = astroid.builder.parse('')
+    cache = import_resolution.ResolutionCache(str(tmpdir))
+    cache.set('xml.dom', False)  # Deliberately wrong, to tell where the answer came from
+    resolver = import_resolution.ImportResolver(cache)
+    assert not resolver.is_module(importer, 'xml.dom')
+    assert resolver.is_module(importer, 'xml.sax')
+    assert cache.get('xml.sax') is True
+
+
+@pytest.fixture
+def packages(tmpdir, monkeypatch):
+    package = tmpdir.mkdir('package')
+    package.join('__init__.py').write('')
+    package.join('module.py').write('')
+    package.join('stub.pyi').write('')
+    package.join('extension' + importlib.machinery.EXTENSION_SUFFIXES[0]).write('')
+    package.mkdir('subpackage').join('__init__.py').write('')
+    package.mkdir('not_a_package_data')
+    tmpdir.mkdir('namespace').mkdir('portion').join('module.py').write('')
+    monkeypatch.syspath_prepend(str(tmpdir))
+    return tmpdir
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('package', True),
+    ('package.module', True),
+    ('package.stub', True),
+    ('package.extension', True),
+    ('package.subpackage', True),
+    ('package.not_a_package_data', True),  # A namespace package portion
+    ('namespace.portion.module', True),
+    ('package.function', False),
+    ('package.module.function', False),
+    ('namespace.missing', False),
+    ('missing_package', None),
+    ('missing_package.module', None),
+    ('sys', True),
+    ('sys.path', None),
+    ('os.path', None),  # Registered in sys.modules by os
+    ('xml.dom', True),
+    ('os.environ', False),
+])
+def test_spec_finder(packages, name, expected):  # pylint: disable=unused-argument
+    assert import_resolution.SpecFinder().find(name) == expected
+
+
+def test_spec_finder_ignores_importer_directory(tmpdir, monkeypatch):
+    tmpdir.join('sibling.py').write('')
+    assert import_resolution.SpecFinder().find('sibling') is None
+    monkeypatch.syspath_prepend(str(tmpdir))
+    assert import_resolution.SpecFinder().find('sibling') is True
+
+
+@pytest.mark.parametrize('first', [0, 1])
+def test_import_resolver_answers_alike_for_every_importer(tmpdir, first):
+    with_utils, without_utils = tmpdir.mkdir('with_utils'), tmpdir.mkdir('without_utils')
+    with_utils.join('utils.py').write('')
+    importers = [astroid.builder.parse('', 'importer', str(directory.join('importer.py')))
+                 for directory in (with_utils, without_utils)]
+    expected = [import_resolution.ImportResolver().is_module(importer, 'utils') for importer in importers]
+    assert expected == [False, False]  # Absolute imports aren't looked up next to the importer
+
+    resolver = import_resolution.ImportResolver(finder=import_resolution.SpecFinder())
+    order = [first, 1 - first]
+    assert [resolver.is_module(importers[index], 'utils') for index in order] == [expected[index] for index in order]
+
+
+def test_spec_finder_leaves_zip_files_to_astroid(tmpdir, monkeypatch):
+    tmpdir.join('archive.zip').write('')
+    monkeypatch.syspath_prepend(str(tmpdir.join('archive.zip')))
+    assert import_resolution.SpecFinder().find('xml.dom') is None
+
+
+def test_import_resolver_falls_back_to_astroid(monkeypatch):
+    importer = astroid.builder.parse('')
+    resolver = import_resolution.ImportResolver(finder=import_resolution.SpecFinder())
+    imported = []
+    original_import_module = astroid.Module.import_module
+
+    def import_module(module, name, *args, **kwargs):
+        imported.append(name)
+        return original_import_module(module, name, *args, **kwargs)
+
+    monkeypatch.setattr(astroid.Module, 'import_module', import_module)
+    assert resolver.is_module(importer, 'xml.dom')
+    assert not resolver.is_module(importer, 'os.environ')
+    assert not imported
+    assert resolver.is_module(importer, 'os.path')
+    assert imported[0] == 'os.path'
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('package', True),
+    ('package.module', True),
+    ('package.stub', True),
+    ('package.extension', True),
+    ('package.subpackage', True),
+    ('package.not_a_package_data', True),
+    ('namespace.portion.module', True),
+    ('package.function', False),
+    ('package.module.function', False),
+    ('package.__init__', False),
+    ('namespace.missing', False),
+    ('missing_package', None),
+    ('missing_package.module', None),
+])
+def test_module_name_index(packages, name, expected):
+    index = import_resolution.ModuleNameIndex.build(str(packages.join('index')), [str(packages)])
+    assert index.find(name) == expected
+    assert len(index) == 9
+
+
+def test_module_name_index_defers_shadowed_packages(packages, tmpdir_factory, monkeypatch):
+    index = import_resolution.ModuleNameIndex.build(str(packages.join('index')), [str(packages)])
+    assert index.directories == [str(packages)]
+    linted = tmpdir_factory.mktemp('linted')
+    linted.mkdir('package').join('__init__.py').write('')
+    linted.join('package', 'added.py').write('')
+    monkeypatch.syspath_prepend(str(linted))
+
+    assert index.find('package.module') is None
+    assert index.find('package.added') is None
+    assert index.find('namespace.portion.module') is True
+
+
+def test_module_name_index_lookups(tmpdir):
+    names = ['m{:04d}'.format(number) for number in range(0, 2000, 3)]
+    for name in names:
+        tmpdir.join(name + '.py').write('')
+    index = import_resolution.ModuleNameIndex.build(str(tmpdir.join('index')), [str(tmpdir)])
+    for number in range(2000):
+        assert ('m{:04d}'.format(number) in index) == (number % 3 == 0)
+    assert '' not in index
+    assert 'a' not in index
+    assert 'z' not in index
+
+
+def test_module_name_index_rebuilt_when_directories_change(tmpdir):
+    modules = tmpdir.mkdir('modules')
+    index_path = str(tmpdir.join('index'))
+    index = import_resolution.ModuleNameIndex.load(index_path, [str(modules)])
+    assert 'added' not in index
+    assert import_resolution.ModuleNameIndex.load(index_path, [str(modules)]).fingerprint == index.fingerprint
+
+    modules.join('added.py').write('')
+    os.utime(str(modules), (0, 0))
+    assert 'added' in import_resolution.ModuleNameIndex.load(index_path, [str(modules)])
+
+
+def test_module_name_index_rejects_other_files(tmpdir):
+    tmpdir.join('index').write('not an index\n')
+    with pytest.raises(ValueError):
+        import_resolution.ModuleNameIndex(str(tmpdir.join('index')))
+    assert len(import_resolution.ModuleNameIndex.load(str(tmpdir.join('index')), [str(tmpdir)])) == 0
+
+
+def test_import_resolver_uses_index(packages, monkeypatch):
+    importer = astroid.builder.parse('')
+    index = import_resolution.ModuleNameIndex.build(str(packages.join('index')), [str(packages)])
+    resolver = import_resolution.ImportResolver(index=index)
+    monkeypatch.setattr(astroid.Module, 'import_module', None)
+    assert resolver.is_module(importer, 'package.module')
+    assert not resolver.is_module(importer, 'package.function')
+
+
+def test_import_resolver_prefetch(packages, monkeypatch):  # pylint: disable=unused-argument
+    importer = astroid.builder.parse('')
+    imports = ['package.module', 'package.function', 'os.path', 'missing_package.module']
+    monkeypatch.setattr(astroid.Module, 'import_module', None)
+    resolver = import_resolution.ImportResolver(finder=import_resolution.SpecFinder())
+    resolver.prefetch(imports, jobs=2)
+    assert resolver.is_module(importer, 'package.module')
+    assert not resolver.is_module(importer, 'package.function')
+    assert (resolver.hits, resolver.misses) == (2, 0)
+
+
+def test_import_resolver_prefetch_leaves_undecided_names_to_astroid(monkeypatch):
+    def import_module(*_):
+        raise AssertionError('Prefetched with astroid')
+
+    monkeypatch.setattr(astroid.Module, 'import_module', import_module)
+    importer = astroid.builder.parse('')
+    with_finder = import_resolution.ImportResolver(finder=import_resolution.SpecFinder())
+    with_finder.prefetch(['os.path', 'missing_package'])
+    astroid_only = import_resolution.ImportResolver()
+    astroid_only.prefetch(['xml.dom'])
+
+    monkeypatch.setattr(astroid.Module, 'import_module', lambda *_: None)
+    assert with_finder.is_module(importer, 'os.path')
+    assert astroid_only.is_module(importer, 'xml.dom')
+    assert (with_finder.hits, with_finder.misses, astroid_only.hits, astroid_only.misses) == (0, 1, 0, 1)
+
+
+def test_requested_prefetches():
+    assert import_resolution.requested_prefetches() == set()
+    with import_resolution.prefetching({'xml.dom'}):
+        with import_resolution.prefetching({'xml.dom', 'os.path'}):
+            assert import_resolution.requested_prefetches() == {'xml.dom', 'os.path'}
+        assert import_resolution.requested_prefetches() == {'xml.dom'}
+    assert import_resolution.requested_prefetches() == set()
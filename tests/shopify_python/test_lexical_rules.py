@@ -0,0 +1,120 @@
+import glob
+import os
+import subprocess
+import sys
+import tokenize
+import typing
+
+from shopify_python import lexical_rules
+from shopify_python import shopify_styleguide
+
+
+def test_check_file(tmpdir):
+    source = tmpdir.join('source.py')
+    source.write('import os  # pylint: disable=unused-import,W0611\n'
+                 'import typing\n'
+                 'DOC = """\n'
+                 '# pylint: disable=W0612\n'
+                 'Sequence[str]\n'
+                 '"""\n'
+                 'def fnc(names, more):  # type: (typing.Sequence[str], typing.Sequence[int]) -> None\n'
+                 '    pass\n'
+                 'def fnc(names: typing.Sequence[str], more: typing.Sequence[int]) -> None:\n'
+                 '    pass  #pylint:disable=C0112\n')
+    assert lexical_rules.check_file(str(source)) == [
+        ('disable-name-only', 1, 'W0611'),
+        ('sequence-of-string', 7, None),
+        ('sequence-of-string', 9, None),
+        ('sequence-of-string', 9, None),
+        ('disable-name-only', 10, 'C0112'),
+    ]
+    tmpdir.join('empty.py').write('')
+    assert lexical_rules.check_file(str(tmpdir.join('empty.py'))) == []
+
+
+def test_check_file_honours_pragmas(tmpdir):
+    source = tmpdir.join('source.py')
+    source.write('import os  # pylint: disable=W0611\n'
+                 '# pylint: disable=C6102\n'
+                 'NAMES = None  # type: typing.Sequence[str]\n'
+                 '# pylint: enable=sequence-of-string\n'
+                 'class Names(object):  # pylint: disable=C\n'
+                 '    NAMES = None  # type: typing.Sequence[str]\n'
+                 '    import os  # pylint: disable=W0611,C6101\n'
+                 '\n'
+                 '    def fnc(self):\n'
+                 '        # pylint: disable=shopify-styleguide-checker\n'
+                 '        names = os  # type: typing.Sequence[str]\n'
+                 '        return names\n'
+                 '    OTHER = None  # type: typing.Sequence[str]\n'
+                 'class Other:  # pylint: disable=C6102,C6101\n'
+                 '    NAMES = None  # type: typing.Sequence[str]\n'
+                 'try:  # pylint: disable=C6102,C6101\n'
+                 '    NAMES = None  # type: typing.Sequence[str]\n'
+                 'finally:\n'
+                 '    NAMES = None  # type: typing.Sequence[str]\n'
+                 '# pylint: disable-next=C6101\n'
+                 'import sys  # pylint: disable=W0611\n'
+                 'import re  # pylint: disable=W0611\n'
+                 'import os  # pylint: disable=W0611,disable-name-only\n')
+    assert lexical_rules.check_file(str(source)) == [
+        ('disable-name-only', 1, 'W0611'),
+        ('disable-name-only', 2, 'C6102'),
+        ('sequence-of-string', 6, None),
+        ('sequence-of-string', 13, None),
+        ('disable-name-only', 22, 'W0611'),
+        ('disable-name-only', 23, 'W0611'),
+    ]
+    for pragma in ('skip-file', 'disable=all'):
+        source.write('import os  # pylint: disable=W0611\n'
+                     '# pylint: {}\n'.format(pragma))
+        assert lexical_rules.check_file(str(source)) == []
+
+
+def test_check_file_matches_checking_every_token():
+    for path in glob.glob(os.path.join(os.path.dirname(typing.__file__), '*.py'))[:200]:
+        with open(path, 'rb') as source_file:
+            try:
+                expected = list(lexical_rules.lexical_messages(tokenize.tokenize(source_file.readline)))
+            except (tokenize.TokenError, SyntaxError):
+                expected = []
+        assert lexical_rules.check_file(path) == expected
+
+
+def test_main(tmpdir, capsys):
+    tmpdir.mkdir('package').join('module.py').write('import os  # pylint: disable=W0611\n')
+    tmpdir.mkdir('.hidden').join('module.py').write('import os  # pylint: disable=W0611\n')
+    assert lexical_rules.main([str(tmpdir)]) == 1
+    assert capsys.readouterr().out == (
+        "{}:1: W0611 disabled as a message code, use ''unused-import'' instead (disable-name-only)\n".format(
+            tmpdir.join('package', 'module.py')))
+    assert lexical_rules.main([str(tmpdir.join('package'))]) == 1
+
+
+def test_message_text():
+    assert lexical_rules.message_text(lexical_rules.LexicalMessage('disable-name-only', 1, 'W0611'),
+                                      {'W0611': "'unused-import'"}) == \
+        "W0611 disabled as a message code, use ''unused-import'' instead"
+    assert lexical_rules.message_text(lexical_rules.LexicalMessage('disable-name-only', 1, 'X9999'), {}) == \
+        "X9999 disabled as a message code, use 'unknown' instead"
+    assert lexical_rules.message_text(lexical_rules.LexicalMessage('sequence-of-string', 1, None)) == \
+        lexical_rules.MESSAGES['C6102'][0]
+
+
+def test_message_names_of_the_installed_pylint():
+    assert lexical_rules.message_names() == shopify_styleguide.default_message_names()
+
+
+def test_runs_without_pylint_or_astroid(tmpdir):
+    tmpdir.join('module.py').write('import os  # pylint: disable=W0611\n')
+    output = subprocess.check_output([sys.executable, '-c', '\n'.join([
+        'import sys',
+        'sys.modules["pylint"] = sys.modules["astroid"] = None  # Not installed',
+        'from shopify_python import lexical_rules',
+        'lexical_rules.main([sys.argv[1]])',
+        'print(lexical_rules.message_names() is lexical_rules.known_messages.NAMES)',
+        'print(sorted(name for name, module in sys.modules.items()',
+        '             if module is not None and name.split(".")[0] in ("pylint", "astroid")))',
+    ]), str(tmpdir)]).decode('utf-8').splitlines()
+    assert "use ''unused-import'' instead" in output[0]
+    assert output[1:] == ['True', '[]']
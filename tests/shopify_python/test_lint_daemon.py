@@ -0,0 +1,102 @@
+import contextlib
+import json
+import os
+import socket
+import threading
+import typing  # pylint: disable=unused-import
+
+import py  # pylint: disable=unused-import
+import pytest
+
+from shopify_python import git_utils
+from shopify_python import lint_daemon
+
+
+@pytest.fixture
+def socket_path(tmpdir):
+    # type: ('py.path.LocalPath') -> typing.Generator[str, None, None]
+    path = str(tmpdir.join('daemon.sock'))
+    server = lint_daemon.LintServer(path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    assert not os.path.exists(path)
+
+
+def test_daemon_lints_like_pylint_files(tmpdir, monkeypatch, socket_path):
+    # type: ('py.path.LocalPath', typing.Any, str) -> None
+    monkeypatch.chdir(tmpdir)
+    tmpdir.join('first.py').write('import os\n')
+    tmpdir.join('second.py').write('"""Second."""\nimport first\nprint(first.os)\n')
+    files = ['first.py', 'second.py']
+    expected = list(git_utils.pylint_files(files, disable='missing-docstring'))
+    assert list(lint_daemon.pylint_files(socket_path, files, disable='missing-docstring')) == expected
+
+    runs = []
+    run_pylint = git_utils.run_pylint
+    monkeypatch.setattr(git_utils, 'run_pylint', lambda *args: runs.append(args) or run_pylint(*args))
+    assert list(lint_daemon.pylint_files(socket_path, files, disable='missing-docstring')) == expected
+    assert not runs  # Checked by the linter of the first request
+
+    list(lint_daemon.pylint_files(socket_path, files[:1]))
+    assert len(runs) == 1  # Other arguments, so another linter
+
+
+def test_daemon_rebuilds_changed_modules(tmpdir, monkeypatch, socket_path):
+    # type: ('py.path.LocalPath', typing.Any, str) -> None
+    monkeypatch.chdir(tmpdir)
+    tmpdir.join('imported.py').write('"""Imported."""\nimport os\n')
+    tmpdir.join('importer.py').write('"""Importer."""\nimport imported\nprint(imported.os)\n')
+
+    def symbols():
+        # type: () -> typing.List[str]
+        return [message.msg_id for message in lint_daemon.pylint_files(socket_path, ['importer.py'])]
+
+    assert 'E1101' not in symbols()
+    tmpdir.join('imported.py').write('"""Imported, without os."""\n')
+    os.utime(str(tmpdir.join('imported.py')), (0, 0))
+    assert 'E1101' in symbols()
+
+
+def test_daemon_finds_added_modules(tmpdir, monkeypatch, socket_path):
+    # type: ('py.path.LocalPath', typing.Any, str) -> None
+    monkeypatch.chdir(tmpdir)
+    package = tmpdir.mkdir('pkg')
+    package.join('__init__.py').write('"""Package."""\nnew = None\n')
+    tmpdir.join('importer.py').write('"""Importer."""\nfrom pkg import new\nprint(new)\n')
+
+    def symbols():
+        # type: () -> typing.List[str]
+        return [message.msg_id for message in lint_daemon.pylint_files(
+            socket_path, ['importer.py'], **{'load-plugins': 'shopify_python'})]
+
+    assert 'C6001' in symbols()  # import-modules-only
+    package.join('new.py').write('"""New."""\n')
+    assert 'C6001' not in symbols()
+
+
+def test_daemon_reports_errors(tmpdir, monkeypatch, socket_path):
+    # type: ('py.path.LocalPath', typing.Any, str) -> None
+    def fail(*_):
+        raise RuntimeError('Crashed')
+
+    monkeypatch.chdir(tmpdir)
+    monkeypatch.setattr(git_utils, 'run_pylint', fail)
+    with pytest.raises(lint_daemon.LintDaemonError, match='RuntimeError: Crashed'):
+        lint_daemon.pylint_files(socket_path, ['missing.py'])
+
+
+@pytest.mark.parametrize('request_line', [b'{"files": [\n', b'{"files": []}\n'])
+def test_daemon_answers_malformed_requests(socket_path, request_line):
+    # type: (str, bytes) -> None
+    with contextlib.closing(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)) as connection:
+        connection.connect(socket_path)
+        connection.sendall(request_line)
+        with contextlib.closing(connection.makefile('rb')) as response_file:
+            response = json.loads(response_file.readline().decode('utf-8'))
+    assert list(response) == ['error']
+
+    assert lint_daemon.pylint_files(socket_path, ['missing.py']) is not None  # Still serving
@@ -0,0 +1,36 @@
+import typing  # pylint: disable=unused-import
+
+import py  # pylint: disable=unused-import
+
+from shopify_python import quick_pass
+
+
+def test_python_files_in(tmpdir):
+    # type: ('py.path.LocalPath') -> None
+    package = tmpdir.mkdir('package')
+    package.join('b.py').write('')
+    package.join('a.py').write('')
+    package.join('data.txt').write('')
+    package.mkdir('.hidden').join('module.py').write('')
+    tmpdir.join('script').write('')
+
+    assert list(quick_pass.python_files_in([str(tmpdir.join('script')), str(tmpdir), 'missing', 'some.module'])) == [
+        str(tmpdir.join('script')), str(package.join('a.py')), str(package.join('b.py'))]
+
+
+def test_main(tmpdir, capsys):
+    # type: ('py.path.LocalPath', typing.Any) -> None
+    tmpdir.join('module.py').write('first\nsecond\n')
+
+    def check_file(path):
+        # type: (str) -> typing.List[str]
+        with open(path) as source_file:
+            return [line for line in source_file.read().splitlines() if line == 'second']
+
+    assert quick_pass.main(check_file, '{}: {}'.format, [str(tmpdir)]) == 1
+    assert capsys.readouterr().out == '{}: second\n'.format(tmpdir.join('module.py'))
+
+    tmpdir.join('module.py').write('first\n')
+    assert quick_pass.main(check_file, '{}: {}'.format, [str(tmpdir)]) == 0
+    assert quick_pass.main(check_file, '{}: {}'.format, [str(tmpdir), 'missing.py']) == 1
+    assert capsys.readouterr().err == 'missing.py: No such file or directory\n'
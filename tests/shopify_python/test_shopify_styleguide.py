@@ -1,6 +1,13 @@
+import io
+
+import astroid
 import mock
+import pylint.lint
 import pylint.testutils
+import pytest
 
+from shopify_python import known_messages
+from shopify_python import lexical_rules
 from shopify_python import shopify_styleguide
 
 
@@ -14,6 +21,8 @@ class TestShopifyStyleGuideChecker(pylint.testutils.CheckerTestCase):
         mock_msgs_store = mock.Mock()
         mock_msgs_store.get_msg_display_string = mock.Mock()
         mock_msgs_store.get_msg_display_string.return_value = 'mocked'
+        codes = ('W0611', 'C0302', 'C0303', 'C0112')
+        mock_msgs_store.messages = [mock.Mock(msgid=code, old_names=[]) for code in codes]
         setattr(self.linter, 'msgs_store', mock_msgs_store)
 
         # Create tokens
@@ -49,4 +58,61 @@ class TestShopifyStyleGuideChecker(pylint.testutils.CheckerTestCase):
         ]):
             self.checker.process_tokens(tokens)
         mock_msgs_store.get_msg_display_string.assert_has_calls(
-            [mock.call(code) for _, code in expected_line_msgcodes])
+            [mock.call(code) for code in codes], any_order=True)
+
+    def test_disable_unknown_code(self):
+        tokens = pylint.testutils._tokenize_str(  # pylint: disable=protected-access
+            'import os  # pylint: disable=C9999\n')
+        self.checker.process_tokens(tokens)
+        assert [message.args for message in self.linter.release_messages()] == [{'code': 'C9999', 'name': 'unknown'}]
+
+    def test_disabled_messages_are_not_checked(self):
+        tokens = pylint.testutils._tokenize_str(  # pylint: disable=protected-access
+            """
+        import os  # pylint: disable=W0611
+        def fnc(names):  # type: (typing.Sequence[str]) -> None
+            pass
+        """.strip())
+        mock_msgs_store = mock.Mock()
+        setattr(self.linter, 'msgs_store', mock_msgs_store)
+        setattr(self.linter, 'is_message_enabled', mock.Mock(return_value=False))
+        self.checker.process_tokens(tokens)
+        assert not self.linter.release_messages()
+        mock_msgs_store.get_msg_display_string.assert_not_called()
+
+    def test_only_lines_with_markers_are_checked(self):
+        assert lexical_rules.marked_lines(
+            b'import os  # pylint: disable=W0611\n'
+            b'import typing\n'
+            b'def fnc(names):  # type: (typing.Sequence[str]) -> None\n'
+            b'    pass\n'
+            b'# pylint:disable=W0612'
+        ) == {1, 3, 5}
+
+        def unexpected_tokens():
+            raise AssertionError('Tokens processed for a module without markers')
+            yield  # pylint: disable=unreachable
+
+        self.checker.process_module(astroid.builder.AstroidBuilder().string_build('import os  # Comment\n'))
+        self.checker.process_tokens(unexpected_tokens())
+
+
+def test_message_names():
+    linter = pylint.lint.PyLinter()
+    linter.load_default_plugins()
+    linter.load_plugin_modules(['shopify_python'])
+    names = shopify_styleguide.message_names(linter)
+    assert names['W0611'] == linter.msgs_store.get_msg_display_string('W0611')
+    assert names['C6001'] == repr('import-modules-only')
+    assert names['C6101'] == repr('disable-name-only')
+    assert 'X9999' not in names
+    with pytest.raises(TypeError):
+        names['X9999'] = 'new'  # type: ignore
+    assert names == shopify_styleguide.default_message_names()
+
+
+def test_known_messages_match_installed_pylint():
+    with io.open(known_messages.__file__, encoding='utf-8') as source_file:
+        source = source_file.read()
+    # Otherwise regenerate the table with `make known_messages`
+    assert source == shopify_styleguide.known_messages_source(shopify_styleguide.default_message_names())
@@ -0,0 +1,149 @@
+import ast
+import io
+import os
+import subprocess
+import sys
+
+import astroid
+import pytest
+
+import shopify_python.ast
+from shopify_python import size_rules
+
+FUNCTIONAL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'functional')
+
+CORPUS = [
+    '''
+"""Module docstring."""
+import os
+import subprocess
+from os import path as p, sep
+x, *y = a.b[1:2, ::3], {**d, 'k': -v}
+''',
+    '''
+@decorator
+@other(arg=1)
+def fnc(a, b: int = 1, *args: str, c, d=2, **kwargs: bool) -> None:
+    """Docstring."""
+    global counter
+    with open(a) as f, lock:
+        yield from (i async for i in f if i)
+''',
+    '''
+class Meta(Base, metaclass=abc.ABCMeta, flag=True):
+    """Docstring."""
+    attr: int = 1
+
+    async def method(self, /, pos, *, key=None):
+        async with ctx() as (a, b):
+            return [await x for x in pos], {k: v for k, v in key}, f'{pos!r:>{key}}'
+''',
+    '''
+try:
+    x = 1
+except ValueError as error:
+    del error
+except (TypeError, KeyError):
+    raise
+else:
+    pass
+finally:
+    y = lambda a, *b, c=1, **d: (a if b else c) or d
+try:
+    pass
+finally:
+    z = not (x := 2) < 3 <= 4
+''',
+]
+if sys.version_info >= (3, 10):
+    CORPUS.append('''
+match command:
+    case Point(x=0, y=0) | [1, *rest] as point:
+        pass
+    case {'key': value, **others} if value > 1:
+        pass
+    case _:
+        pass
+''')
+
+
+def _functional_sources():
+    for file_name in sorted(os.listdir(FUNCTIONAL_DIR)):
+        if file_name.endswith('.py') and file_name != '__init__.py':
+            with io.open(os.path.join(FUNCTIONAL_DIR, file_name), encoding='utf8') as source_file:
+                source = source_file.read()
+            try:
+                ast.parse(source)
+            except SyntaxError:
+                continue  # e.g. Python 2 only syntax
+            yield source
+
+
+@pytest.mark.parametrize('source', CORPUS + list(_functional_sources()))
+def test_counts_match_astroid(source):
+    astroid_tree = astroid.builder.parse(source)
+    ast_tree = ast.parse(source)
+    assert size_rules.count_tree_size(ast_tree) == shopify_python.ast.count_tree_size(astroid_tree)
+
+    # Compare the units the size rules measure
+    astroid_units = []
+    for node in astroid_tree.nodes_of_class((astroid.TryExcept, astroid.TryFinally, astroid.Lambda)):
+        if isinstance(node, astroid.TryExcept):
+            astroid_units.append([node.body] + [[handler] for handler in node.handlers])
+        elif isinstance(node, astroid.TryFinally):
+            astroid_units.append([node.finalbody])
+        elif not isinstance(node, astroid.FunctionDef):
+            astroid_units.append([[node]])
+    ast_units = []
+    for node in ast.walk(ast_tree):
+        if isinstance(node, ast.Try):
+            if node.handlers:
+                ast_units.append([node.body] + [[handler] for handler in node.handlers])
+            if node.finalbody:
+                ast_units.append([node.finalbody])
+        elif isinstance(node, ast.Lambda):
+            ast_units.append([[node]])
+
+    def sizes(units, count):
+        return sorted([sum(count(child) for child in body) for body in unit] for unit in units)
+
+    assert sizes(ast_units, size_rules.count_tree_size) == sizes(astroid_units, shopify_python.ast.count_tree_size)
+
+
+@pytest.mark.parametrize('rule', ['try_too_long', 'except_too_long', 'finally_too_long', 'use_simple_lambdas'])
+def test_messages_match_functional_tests(rule):
+    with io.open(os.path.join(FUNCTIONAL_DIR, rule + '.py'), encoding='utf8') as source_file:
+        source = source_file.read()
+    expected = [(line_number, rule.replace('_', '-')) for line_number, line in enumerate(source.splitlines(), 1)
+                if '# [{}]'.format(rule.replace('_', '-')) in line]
+    assert expected
+    messages = [(message.line, message.symbol) for message in size_rules.check_source(source)
+                if message.symbol == rule.replace('_', '-')]
+    assert messages == expected
+
+
+def test_check_source_limits():
+    source = 'f = lambda x, y: x + y\n'
+    assert size_rules.check_source(source) == []
+    assert size_rules.check_source(source, max_lambda_nodes=5) == [
+        size_rules.SizeMessage('use-simple-lambdas', 1, 4, 7)]
+
+
+def test_main(tmpdir, capsys):
+    good_file = tmpdir.join('good.py')
+    good_file.write('f = lambda x: x\n')
+    bad_file = tmpdir.join('bad.py')
+    bad_file.write('try:\n    pass\nfinally:\n    ' + ' + '.join(['x'] * 10) + '\n')
+
+    assert size_rules.main([str(good_file)]) == 0
+    assert size_rules.main([str(good_file), str(bad_file)]) == 1
+    assert capsys.readouterr().out == '{}:1:0: finally-too-long (20 nodes)\n'.format(bad_file)
+
+
+def test_runs_without_pylint_or_astroid():
+    loaded = subprocess.check_output([sys.executable, '-c', '\n'.join([
+        'import sys',
+        'import shopify_python.size_rules',
+        'print(sorted(name for name in sys.modules if name.split(".")[0] in ("pylint", "astroid")))',
+    ])])
+    assert loaded.decode('utf-8').strip() == '[]'